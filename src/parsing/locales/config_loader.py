@@ -10,9 +10,11 @@ Config Loader для конфигураций локалей парсинга.
 """
 
 import copy
+import re
+import threading
 import yaml
 from pathlib import Path
-from typing import Dict, List, Any, Optional, ClassVar
+from typing import Dict, List, Any, Optional, ClassVar, Tuple
 from dataclasses import dataclass, field
 from loguru import logger
 
@@ -40,6 +42,40 @@ class MetadataConfig:
     """
     total_keywords: List[str]
     detection_keywords: List[str] = field(default_factory=list)
+    
+    # Ключевые слова суммы в нижнем регистре (собираются один раз при создании)
+    total_keywords_lower: Tuple[str, ...] = field(init=False, repr=False, compare=False)
+    
+    def __post_init__(self) -> None:
+        self.total_keywords_lower = tuple(kw.lower() for kw in self.total_keywords)
+
+
+def compile_keywords(keywords: List[str]) -> Optional[re.Pattern[str]]:
+    """
+    Собирает ключевые слова в одну регулярку-альтернацию.
+    
+    Поиск `pattern.search(text)` эквивалентен `any(kw in text for kw in keywords)`,
+    но проходит строку одним вызовом движка regex вместо цикла по словам.
+    """
+    if not keywords:
+        return None
+    return re.compile("|".join(re.escape(kw) for kw in keywords))
+
+
+def _compile_patterns(patterns: List[str]) -> List[re.Pattern[str]]:
+    """
+    Компилирует regex-паттерны конфига (IGNORECASE) для проверки "совпал хоть один".
+    
+    Обычно все паттерны объединяются в одну альтернацию — строка проходится
+    движком один раз. Если объединить нельзя (например, глобальный inline-флаг
+    не в начале паттерна), каждый паттерн компилируется отдельно.
+    """
+    if len(patterns) <= 1:
+        return [re.compile(p, re.IGNORECASE) for p in patterns]
+    try:
+        return [re.compile("|".join(f"(?:{p})" for p in patterns), re.IGNORECASE)]
+    except re.error:
+        return [re.compile(p, re.IGNORECASE) for p in patterns]
 
 
 @dataclass
@@ -64,6 +100,24 @@ class SemanticConfig:
     clean_outliers_strategy: str = "standard"  # 'none' | 'standard' | 'deep_prefix'
     allow_joined_prices: bool = False          # Разрешить цены без разделителя слева (Text9,99)
     name_buffer_size: int = 3                  # Размер буфера для сохранения имен без цен
+    
+    # Скомпилированные паттерны (собираются один раз при создании)
+    weight_regexes: List[re.Pattern[str]] = field(init=False, repr=False, compare=False)
+    tax_regexes: List[re.Pattern[str]] = field(init=False, repr=False, compare=False)
+    skip_keywords_re: Optional[re.Pattern[str]] = field(init=False, repr=False, compare=False)
+    discount_keywords_re: Optional[re.Pattern[str]] = field(init=False, repr=False, compare=False)
+    legal_header_re: Optional[re.Pattern[str]] = field(init=False, repr=False, compare=False)
+    
+    def __post_init__(self) -> None:
+        self.weight_regexes = _compile_patterns(self.weight_patterns)
+        self.tax_regexes = _compile_patterns(self.tax_patterns)
+        
+        # Ключевые слова ищутся в тексте строки в нижнем регистре
+        self.skip_keywords_re = compile_keywords(self.skip_keywords)
+        self.discount_keywords_re = compile_keywords(self.discount_keywords)
+        self.legal_header_re = compile_keywords(
+            [identifier.lower() for identifier in self.legal_header_identifiers]
+        )
 
 
 @dataclass
@@ -94,6 +148,7 @@ class LocaleConfig:
     # Внутренние поля (кеш и директория)
     _config_dir: Optional[Path] = None
     _cache: ClassVar[Dict[str, "LocaleConfig"]] = {}
+    _cache_lock: ClassVar[threading.RLock] = threading.RLock()
     _source_file: Optional[str] = None
     
     # === Backward Compatibility Properties ===
@@ -132,24 +187,30 @@ class LocaleConfig:
         """
         cache_key = f"{locale_code}:{store_name.lower() if store_name else ''}"
         
-        # Проверяем кеш
-        if cache_key in cls._cache:
-            return cls._cache[cache_key]
-        
-        # 1. Определяем директорию
-        if cls._config_dir is None:
-            current_file = Path(__file__)
-            cls._config_dir = current_file.parent
-        
-        config_dir = Path(cls._config_dir)
-        
-        # 2. Загружаем основной конфиг локали
-        locale_config = cls._load_locale_yaml(config_dir, locale_code, store_name)
+        # Проверяем кеш (без блокировки — быстрый путь для уже загруженных)
+        cached = cls._cache.get(cache_key)
+        if cached is not None:
+            return cached
         
-        # 3. Сохраняем в кеш
-        cls._cache[cache_key] = locale_config
-        
-        return locale_config
+        # Загрузка под блокировкой: при process_batch потоки не читают один YAML дважды
+        with cls._cache_lock:
+            if cache_key in cls._cache:
+                return cls._cache[cache_key]
+            
+            # 1. Определяем директорию
+            if cls._config_dir is None:
+                current_file = Path(__file__)
+                cls._config_dir = current_file.parent
+            
+            config_dir = Path(cls._config_dir)
+            
+            # 2. Загружаем основной конфиг локали
+            locale_config = cls._load_locale_yaml(config_dir, locale_code, store_name)
+            
+            # 3. Сохраняем в кеш
+            cls._cache[cache_key] = locale_config
+            
+            return locale_config
 
     @classmethod
     def _load_base_config(cls, config_dir: Path) -> dict:
@@ -8,13 +8,16 @@ Parsing Pipeline - Оркестратор 8 этапов D2.
 Возвращает RawReceiptDTO (контракт D2->D3).
 """
 
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from loguru import logger
 
 from contracts.d1_extraction_dto import RawOCRResult
-from contracts.d2_parsing_dto import RawReceiptDTO, RawReceiptItem
+from contracts.d2_parsing_dto import RawReceiptDTO
 
 # Stage imports
 from .s1_ocr_cleanup import OCRCleanupStage, CleanupResult
@@ -30,7 +33,21 @@ from .s8_validation import ValidationStage, ValidationResult
 from .locales.config_loader import ConfigLoader
 
 
-@dataclass
+# Время для datetime из даты чека (константа, не пересоздаём на каждый товар)
+_MIDNIGHT = datetime.min.time()
+
+
+def _is_passthrough(stage: object) -> bool:
+    """
+    Этап объявлен заглушкой в своём собственном классе.
+    
+    Флаг is_passthrough не наследуется: подкласс заглушки со своим
+    process() выполняется как обычный этап.
+    """
+    return bool(type(stage).__dict__.get("is_passthrough", False))
+
+
+@dataclass(slots=True)
 class PipelineResult:
     """
     Полный результат пайплайна со всеми промежуточными данными.
@@ -54,7 +71,21 @@ class PipelineResult:
     processing_time_ms: float = 0.0
     stages_completed: int = 0
     
-    def to_dict(self) -> dict:
+    def to_dict(self, include_intermediate: bool = True) -> dict:
+        """
+        Сериализует результат в dict.
+        
+        Args:
+            include_intermediate: Включать результаты этапов (для отладки).
+                При False — только DTO и метрики, без обхода строк и товаров этапов.
+        """
+        if not include_intermediate:
+            return {
+                "dto": self.dto.model_dump() if self.dto else None,
+                "processing_time_ms": self.processing_time_ms,
+                "stages_completed": self.stages_completed,
+            }
+        
         return {
             "dto": self.dto.model_dump() if self.dto else None,
             "cleanup": self.cleanup.to_dict() if self.cleanup else None,
@@ -69,6 +100,23 @@ class PipelineResult:
             "stages_completed": self.stages_completed,
         }
 
+    def to_summary_dict(self) -> Dict[str, Any]:
+        """
+        Краткая сводка без сериализации товаров.
+
+        Для логов и трассировки в батчах: только скаляры,
+        без обхода items через pydantic model_dump().
+        """
+        return {
+            "receipt_id": self.dto.receipt_id,
+            "merchant": self.dto.merchant,
+            "total": self.dto.total_amount,
+            "items_count": len(self.dto.items),
+            "validation_passed": self.validation.passed if self.validation else None,
+            "processing_time_ms": self.processing_time_ms,
+            "stages_completed": self.stages_completed,
+        }
+
 
 class ParsingPipeline:
     """
@@ -119,6 +167,19 @@ class ParsingPipeline:
         
         logger.info("[ParsingPipeline] Инициализирован (8 этапов)")
     
+    def warmup(self) -> None:
+        """
+        Прогрев пайплайна перед обработкой первого чека.
+        
+        Загружает YAML конфиги всех локалей и их магазинов и заполняет кеши
+        стадий 4-7, чтобы первый чек в сервисе не платил за холодный старт.
+        """
+        locale_codes = self.locale_stage.warmup()
+        self.store_stage.warmup(locale_codes)
+        self.metadata_stage.warmup(locale_codes)
+        self.semantic_stage.warmup(locale_codes)
+        logger.info("[ParsingPipeline] Прогрев завершён")
+    
     def process(self, raw_ocr: RawOCRResult) -> PipelineResult:
         """
         Обрабатывает RawOCRResult через все 8 этапов.
@@ -129,23 +190,34 @@ class ParsingPipeline:
         Returns:
             PipelineResult: Полный результат с DTO и промежуточными данными
         """
-        import time
-        start_time = time.time()
+        start_ns = time.perf_counter_ns()
         
         source_file = raw_ocr.metadata.source_file if raw_ocr.metadata else "unknown"
         logger.info(f"[ParsingPipeline] Старт обработки: {source_file}")
         
         stages_completed = 0
         
-        # Stage 1: OCR Cleanup
-        logger.debug("[ParsingPipeline] Stage 1/8: OCR Cleanup")
-        cleanup = self.ocr_cleanup_stage.process(raw_ocr)
-        stages_completed += 1
-        
-        # Stage 2: Script Detection
-        logger.debug("[ParsingPipeline] Stage 2/8: Script Detection")
-        script = self.script_detection_stage.process(cleanup)
-        stages_completed += 1
+        if _is_passthrough(self.ocr_cleanup_stage) and _is_passthrough(self.script_detection_stage):
+            # Stage 1-2 — заглушки: результат pass-through собирается напрямую,
+            # без вызова этапов
+            words_count = len(raw_ocr.words)
+            cleanup = CleanupResult(
+                words=raw_ocr.words,
+                original_count=words_count,
+                cleaned_count=words_count,
+            )
+            script = ScriptResult(words=raw_ocr.words)
+            stages_completed += 2
+        else:
+            # Stage 1: OCR Cleanup
+            logger.debug("[ParsingPipeline] Stage 1/8: OCR Cleanup")
+            cleanup = self.ocr_cleanup_stage.process(raw_ocr)
+            stages_completed += 1
+            
+            # Stage 2: Script Detection
+            logger.debug("[ParsingPipeline] Stage 2/8: Script Detection")
+            script = self.script_detection_stage.process(cleanup)
+            stages_completed += 1
         
         # Stage 3: Layout
         logger.debug("[ParsingPipeline] Stage 3/8: Layout")
@@ -188,7 +260,7 @@ class ParsingPipeline:
         )
         
         # Время обработки
-        processing_time_ms = (time.time() - start_time) * 1000
+        processing_time_ms = (time.perf_counter_ns() - start_ns) / 1e6
         
         logger.info(
             f"[ParsingPipeline] Завершено за {processing_time_ms:.1f}ms: "
@@ -209,6 +281,35 @@ class ParsingPipeline:
             stages_completed=stages_completed,
         )
     
+    def process_batch(
+        self,
+        raw_ocrs: List[RawOCRResult],
+        max_workers: Optional[int] = None,
+    ) -> List[PipelineResult]:
+        """
+        Обрабатывает пачку чеков пулом потоков.
+        
+        Чеки независимы друг от друга; стадии разделяют только кеши конфигов
+        (загрузка YAML в LocaleConfig.load — под блокировкой).
+        
+        Args:
+            raw_ocrs: Результаты D1 (Extraction)
+            max_workers: Число потоков (по умолчанию os.cpu_count())
+            
+        Returns:
+            Список PipelineResult в порядке входных чеков
+        """
+        if not raw_ocrs:
+            return []
+        
+        # Один чек — без пула потоков
+        if len(raw_ocrs) == 1:
+            return [self.process(raw_ocrs[0])]
+        
+        workers = min(max_workers or os.cpu_count() or 1, len(raw_ocrs))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(self.process, raw_ocrs))
+    
     def _build_dto(
         self,
         raw_ocr: RawOCRResult,
@@ -220,33 +321,29 @@ class ParsingPipeline:
     ) -> RawReceiptDTO:
         """Собирает RawReceiptDTO из результатов этапов."""
         
-        # Конвертируем ParsedItem в RawReceiptItem
-        items = []
-        for item in semantic.items:
-            items.append(RawReceiptItem(
-                name=item.name,
-                quantity=item.quantity,
-                price=item.price,
-                total=item.total,
-                date=datetime.combine(metadata.receipt_date, datetime.min.time()) 
-                     if metadata.receipt_date else None,
-                raw_text=item.raw_text,
-            ))
-        
-        return RawReceiptDTO(
+        # Дата чека: одна и та же для всех товаров и самого DTO
+        receipt_dt = (
+            datetime.combine(metadata.receipt_date, _MIDNIGHT)
+            if metadata.receipt_date else None
+        )
+        
+        # Конвертируем ParsedItem в RawReceiptItem (без повторной валидации)
+        items = [item.to_raw_item(receipt_dt) for item in semantic.items]
+        
+        # metrics: dict[str, float] — приводим значения сами (это делала валидация)
+        return RawReceiptDTO.model_construct(
             items=items,
             total_amount=metadata.receipt_total,
             merchant=store.store_name,
             store_address=store.store_address,
-            date=datetime.combine(metadata.receipt_date, datetime.min.time()) 
-                 if metadata.receipt_date else None,
+            date=receipt_dt,
             receipt_id=raw_ocr.metadata.source_file if raw_ocr.metadata else None,
             ocr_text=raw_ocr.full_text,
             detected_locale=locale.locale_code,
             metrics={
                 "processing_time_ms": 0.0,  # Заполнится в PipelineResult
-                "items_count": len(semantic.items),
-                "validation_passed": validation.passed,
-                "validation_difference": validation.difference,
+                "items_count": float(len(semantic.items)),
+                "validation_passed": float(validation.passed),
+                "validation_difference": float(validation.difference),
             },
         )
@@ -11,13 +11,13 @@ TODO: Реализовать модули очистки.
 """
 
 from dataclasses import dataclass, field
-from typing import List
+from typing import ClassVar, List
 from loguru import logger
 
 from contracts.d1_extraction_dto import RawOCRResult, Word
 
 
-@dataclass
+@dataclass(slots=True)
 class CleanupResult:
     """
     Результат Stage 1: OCR Cleanup.
@@ -55,6 +55,10 @@ class OCRCleanupStage:
     - unicode_normalizer.py - Нормализация Unicode
     """
     
+    # Pass-through: пайплайн собирает такой же CleanupResult сам, не вызывая process.
+    # Убрать при реализации очистки. Подклассами не наследуется (см. ParsingPipeline).
+    is_passthrough: ClassVar[bool] = True
+    
     def __init__(self):
         """Инициализация stage."""
         pass
@@ -10,8 +10,8 @@ Output: ScriptResult(direction, script, confidence)
 TODO: Реализовать Unicode анализ для RTL/Vertical.
 """
 
-from dataclasses import dataclass
-from typing import List, Literal
+from dataclasses import dataclass, field
+from typing import ClassVar, List, Literal
 from loguru import logger
 
 from contracts.d1_extraction_dto import Word
@@ -21,7 +21,7 @@ from ..s1_ocr_cleanup.stage import CleanupResult
 ScriptDirection = Literal["ltr", "rtl", "vertical"]
 
 
-@dataclass
+@dataclass(slots=True)
 class ScriptResult:
     """
     Результат Stage 2: Script Detection.
@@ -33,11 +33,7 @@ class ScriptResult:
     confidence: float = 1.0
     
     # Передаём слова дальше
-    words: List[Word] = None
-    
-    def __post_init__(self):
-        if self.words is None:
-            self.words = []
+    words: List[Word] = field(default_factory=list)
     
     def to_dict(self) -> dict:
         return {
@@ -60,6 +56,10 @@ class ScriptDetectionStage:
     - unicode_analyzer.py - Анализ Unicode ranges для определения script
     """
     
+    # Заглушка (всегда LTR): пайплайн собирает ScriptResult сам, не вызывая process.
+    # Убрать при реализации анализа. Подклассами не наследуется (см. ParsingPipeline).
+    is_passthrough: ClassVar[bool] = True
+    
     def __init__(self):
         """Инициализация stage."""
         pass
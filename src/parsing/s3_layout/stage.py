@@ -13,14 +13,20 @@ Output: LayoutResult (строки текста с координатами)
 """
 
 from dataclasses import dataclass, field
-from typing import List, Optional
+from operator import attrgetter, le
+from typing import Dict, List, Optional, Tuple
 from loguru import logger
 
 from contracts.d1_extraction_dto import RawOCRResult, Word
 from ..s2_script_detection.stage import ScriptResult
 
 
-@dataclass
+# Ключи сортировки слов: attrgetter работает в C, без вызова Python-лямбды на каждое слово
+_X_KEY = attrgetter("bounding_box.x")
+_Y_KEY = attrgetter("bounding_box.y")
+
+
+@dataclass(slots=True)
 class Line:
     """
     Строка текста на чеке.
@@ -35,6 +41,24 @@ class Line:
     confidence: float = 1.0             # Средняя уверенность слов
     line_number: int = 0                # Номер строки (сверху вниз)
     
+    # Кеш производных полей (считаются при первом обращении)
+    _text_lower: Optional[str] = field(default=None, init=False, repr=False, compare=False)
+    _word_ys: Optional[Tuple[int, ...]] = field(default=None, init=False, repr=False, compare=False)
+    
+    @property
+    def text_lower(self) -> str:
+        """Текст строки в нижнем регистре (для поиска ключевых слов), один раз на строку."""
+        if self._text_lower is None:
+            self._text_lower = self.text.lower()
+        return self._text_lower
+    
+    @property
+    def word_ys(self) -> Tuple[int, ...]:
+        """Y-координаты слов (в порядке words), считаются один раз на строку."""
+        if self._word_ys is None:
+            self._word_ys = tuple(w.bounding_box.y for w in self.words)
+        return self._word_ys
+    
     def to_dict(self) -> dict:
         return {
             "text": self.text,
@@ -47,7 +71,7 @@ class Line:
         }
 
 
-@dataclass
+@dataclass(slots=True)
 class LayoutResult:
     """
     Результат Stage 3: Layout Processing.
@@ -60,10 +84,23 @@ class LayoutResult:
     total_words: int = 0
     script_direction: str = "ltr"       # Направление текста из Stage 2
     
+    # Кеш полного текста (строки не меняются после Stage 3)
+    _full_text: Optional[str] = field(default=None, init=False, repr=False, compare=False)
+    _full_text_lower: Optional[str] = field(default=None, init=False, repr=False, compare=False)
+    
     @property
     def full_text(self) -> str:
-        """Полный текст (все строки через перенос)."""
-        return "\n".join(line.text for line in self.lines)
+        """Полный текст (все строки через перенос), один раз на чек."""
+        if self._full_text is None:
+            self._full_text = "\n".join(line.text for line in self.lines)
+        return self._full_text
+    
+    @property
+    def full_text_lower(self) -> str:
+        """Полный текст в нижнем регистре (из уже приведённых строк), один раз на чек."""
+        if self._full_text_lower is None:
+            self._full_text_lower = "\n".join(line.text_lower for line in self.lines)
+        return self._full_text_lower
     
     @property
     def texts(self) -> List[str]:
@@ -92,13 +129,16 @@ class LayoutStage:
     Учитывает направление текста (LTR/RTL) из Stage 2.
     """
     
-    def __init__(self, y_threshold: int = 15):
+    def __init__(self, y_threshold: int = 15, assume_sorted: bool = False):
         """
         Args:
             y_threshold: Максимальная разница Y для объединения в строку (px).
                         Слова с разницей Y <= threshold считаются одной строкой.
+            assume_sorted: OCR уже отдаёт слова по возрастанию Y — сортировка
+                        пропускается без проверки.
         """
         self.y_threshold = y_threshold
+        self.assume_sorted = assume_sorted
     
     def process(self, script_result: ScriptResult, raw_ocr: Optional[RawOCRResult] = None) -> LayoutResult:
         """
@@ -150,7 +190,7 @@ class LayoutStage:
         Группирует слова в строки по Y-координате.
         
         Алгоритм:
-        1. Сортируем слова по Y
+        1. Сортируем слова по Y (корзинами, см. _sort_by_y)
         2. Объединяем слова с близкими Y в одну строку
         3. Сортируем слова в строке по X (LTR) или обратно (RTL)
         """
@@ -158,7 +198,8 @@ class LayoutStage:
             return []
         
         # Сортируем по Y (сверху вниз)
-        sorted_words = sorted(words, key=lambda w: w.bounding_box.y)
+        sorted_words = self._sort_by_y(words)
+        reverse = (direction == "rtl")
         
         lines: List[List[Word]] = []
         current_line: List[Word] = [sorted_words[0]]
@@ -172,8 +213,7 @@ class LayoutStage:
                 current_line.append(word)
             else:
                 # Сортируем текущую строку по X и добавляем
-                reverse = (direction == "rtl")
-                current_line.sort(key=lambda w: w.bounding_box.x, reverse=reverse)
+                current_line.sort(key=_X_KEY, reverse=reverse)
                 lines.append(current_line)
                 
                 # Начинаем новую строку
@@ -182,24 +222,85 @@ class LayoutStage:
         
         # Добавляем последнюю строку
         if current_line:
-            reverse = (direction == "rtl")
-            current_line.sort(key=lambda w: w.bounding_box.x, reverse=reverse)
+            current_line.sort(key=_X_KEY, reverse=reverse)
             lines.append(current_line)
         
         return lines
     
+    def _sort_by_y(self, words: List[Word]) -> List[Word]:
+        """
+        Сортирует слова по Y через корзины шириной y_threshold.
+        
+        Y ограничен высотой изображения, поэтому раскладка по корзинам
+        `y // y_threshold` — линейная, а сортировать остаётся только
+        маленькие корзины (обычно одна строка чека). Результат совпадает
+        со стабильной сортировкой по Y.
+        
+        Если слова уже идут по возрастанию Y (частый порядок чтения OCR),
+        сортировка не нужна: это проверяется одним проходом.
+        """
+        if self.assume_sorted:
+            return words
+        
+        ys = [w.bounding_box.y for w in words]
+        if all(map(le, ys, ys[1:])):
+            return words
+        
+        if self.y_threshold <= 0:
+            return sorted(words, key=_Y_KEY)
+        
+        buckets: Dict[int, List[Word]] = {}
+        for word in words:
+            buckets.setdefault(word.bounding_box.y // self.y_threshold, []).append(word)
+        
+        sorted_words: List[Word] = []
+        for key in sorted(buckets):
+            bucket = buckets[key]
+            if len(bucket) > 1:
+                bucket.sort(key=_Y_KEY)
+            sorted_words.extend(bucket)
+        
+        return sorted_words
+    
     def _create_line(self, words: List[Word], line_number: int) -> Line:
         """Создаёт Line из списка слов."""
-        # Текст строки
-        text = " ".join(word.text for word in words)
-        
-        # Координаты
-        y_position = min(w.bounding_box.y for w in words)
-        x_min = min(w.bounding_box.x for w in words)
-        x_max = max(w.bounding_box.x + w.bounding_box.width for w in words)
+        # Быстрый путь: строка из одного слова (даты, итоги, заголовки)
+        if len(words) == 1:
+            word = words[0]
+            bbox = word.bounding_box
+            return Line(
+                text=word.text,
+                words=words,
+                y_position=bbox.y,
+                x_min=bbox.x,
+                x_max=bbox.x + bbox.width,
+                confidence=word.confidence,
+                line_number=line_number,
+            )
         
-        # Средняя уверенность
-        confidence = sum(w.confidence for w in words) / len(words) if words else 0.0
+        # Текст, координаты и уверенность — за один проход по словам
+        first_bbox = words[0].bounding_box
+        y_position = first_bbox.y
+        x_min = first_bbox.x
+        x_max = first_bbox.x + first_bbox.width
+        confidence_sum = 0.0
+        parts: List[str] = []
+
+        for w in words:
+            parts.append(w.text)
+            bbox = w.bounding_box
+            if bbox.y < y_position:
+                y_position = bbox.y
+            if bbox.x < x_min:
+                x_min = bbox.x
+            x_end = bbox.x + bbox.width
+            if x_end > x_max:
+                x_max = x_end
+            confidence_sum += w.confidence
+
+        # Текст строки и средняя уверенность
+        text = " ".join(parts)
+        confidence = confidence_sum / len(words)
         
         return Line(
             text=text,
@@ -12,16 +12,17 @@ Output: LocaleResult (locale_code, confidence, matched_keywords)
 3. Выбор локали с максимальным score
 """
 
+import sys
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 from loguru import logger
 
 from ..s3_layout.stage import LayoutResult
 from ..locales.config_loader import ConfigLoader
 
 
-@dataclass
+@dataclass(slots=True)
 class LocaleResult:
     """
     Результат Stage 4: Locale Detection.
@@ -60,10 +61,18 @@ class LocaleDetectionStage:
         """
         self.config_loader = config_loader or ConfigLoader()
         self.default_locale = default_locale
-        self._cached_keywords: Optional[Dict[str, List[str]]] = None
+        self._cached_keywords: Optional[Dict[str, Tuple[Tuple[str, str], ...]]] = None
+        # Уникальные ключевые слова всех локалей (нижний регистр, порядок загрузки)
+        self._all_keywords: Tuple[str, ...] = ()
     
-    def _get_all_locale_keywords(self) -> Dict[str, List[str]]:
-        """Загружает ключевые слова для всех локалей (с кешированием)."""
+    def _get_all_locale_keywords(self) -> Dict[str, Tuple[Tuple[str, str], ...]]:
+        """
+        Загружает ключевые слова для всех локалей (с кешированием).
+        
+        Returns:
+            locale_code -> ((keyword_lower, keyword), ...): нижний регистр
+            для поиска, оригинал для matched_keywords
+        """
         if self._cached_keywords is not None:
             return self._cached_keywords
             
@@ -78,13 +87,32 @@ class LocaleDetectionStage:
             try:
                 config = self.config_loader.load(locale_code)
                 if config.detection_keywords:
-                    keywords_map[locale_code] = config.detection_keywords
+                    # Приводим к нижнему регистру один раз и интернируем:
+                    # одни и те же строки переиспользуются всеми чеками
+                    keywords_map[locale_code] = tuple(
+                        (sys.intern(kw.lower()), sys.intern(kw))
+                        for kw in config.detection_keywords
+                    )
             except Exception:
                 continue
                 
+        self._all_keywords = tuple(dict.fromkeys(
+            kw_lower for keywords in keywords_map.values() for kw_lower, _ in keywords
+        ))
         self._cached_keywords = keywords_map
         return keywords_map
 
+    def warmup(self) -> Tuple[str, ...]:
+        """
+        Заранее загружает конфиги всех локалей и кеш ключевых слов.
+        
+        Returns:
+            Коды загруженных локалей (для прогрева следующих стадий)
+        """
+        keywords = self._get_all_locale_keywords()
+        logger.debug(f"[Stage 4: Locale] Прогрев: {len(keywords)} локалей")
+        return tuple(keywords)
+
     def process(self, layout: LayoutResult) -> LocaleResult:
         """
         Определяет локаль по тексту чека.
@@ -97,34 +125,35 @@ class LocaleDetectionStage:
         """
         logger.debug(f"[Stage 4: Locale] Динамический анализ {len(layout.lines)} строк")
         
-        full_text = layout.full_text.lower()
+        full_text = layout.full_text_lower
         locale_keywords = self._get_all_locale_keywords()
         
+        # Каждое уникальное слово ищется в тексте один раз, сразу для всех локалей
+        # (общие слова вроде брендов не сканируются повторно для каждой локали)
+        found = set(filter(full_text.__contains__, self._all_keywords))
+        
         scores: Dict[str, int] = {}
         matched_by_locale: Dict[str, List[str]] = {}
         
+        # Лучшая локаль выбирается в том же проходе.
+        # При равенстве очков берём ту, где совпавшие слова более "длинные" (уникальные)
+        best_locale = self.default_locale
+        best_key = (0, 0)
+        
         for locale_code, keywords in locale_keywords.items():
-            score = 0
-            matched = []
-            for kw in keywords:
-                if kw.lower() in full_text:
-                    score += 1
-                    matched.append(kw)
-            
-            scores[locale_code] = score
+            matched = [kw for kw_lower, kw in keywords if kw_lower in found] if found else []
+            scores[locale_code] = len(matched)
             matched_by_locale[locale_code] = matched
+            if matched:
+                key = (len(matched), sum(map(len, matched)))
+                if key > best_key:
+                    best_key = key
+                    best_locale = locale_code
             
-        if not any(scores.values()):
+        best_score = best_key[0]
+        if best_score == 0:
             logger.warning(f"[Stage 4: Locale] Ключевые слова не найдены, используем {self.default_locale}")
             return LocaleResult(locale_code=self.default_locale)
-            
-        # Выбираем лучшую локаль
-        # При равенстве очков берём ту, где совпавшие слова более "длинные" (уникальные)
-        best_locale = max(
-            scores, 
-            key=lambda l: (scores[l], sum(len(w) for w in matched_by_locale[l]))
-        )
-        best_score = scores[best_locale]
         
         total_possible = len(locale_keywords.get(best_locale, []))
         confidence = best_score / total_possible if total_possible > 0 else 0.0
@@ -18,24 +18,42 @@ Output: StoreResult (store_name, store_address, confidence)
 - Новый магазин = новый YAML файл, 0 изменений в коде
 """
 
+import re
+from bisect import bisect_right
 from dataclasses import dataclass, field
-from typing import Dict, List, Optional, Set
+from typing import Dict, List, Optional, Sequence, Set, Tuple
 from loguru import logger
 
-from ..s3_layout.stage import LayoutResult
+from ..s3_layout.stage import LayoutResult, Line
 from ..s4_locale_detection.stage import LocaleResult
-from ..locales.config_loader import ConfigLoader, StoreDetectionConfig
+from ..locales.config_loader import ConfigLoader, LocaleConfig, StoreDetectionConfig, compile_keywords
 
 
 # Сколько строк сканировать для поиска магазина
 STORE_SCAN_LIMIT = 15
 
+# Базовые исключения для адреса (универсальные, всегда применяются)
+BASE_NON_ADDRESS_HINTS: List[str] = ["€", "zł", "kč", "czk"]
+
+# Поиск цифры в C вместо посимвольного цикла
+_HAS_DIGIT = re.compile(r"\d").search
+
 # Глобальные бренды, которые присутствуют во многих странах
 # Используются как fallback если магазин не найден в локальных конфигах
 GLOBAL_STORES: Set[str] = {"lidl", "aldi", "carrefour"}
 
 
-@dataclass
+def _has_digit(text: str) -> bool:
+    """
+    Эквивалент any(c.isdigit() for c in text).
+    
+    \\d — только десятичные цифры; str.isdigit() шире (², ①, ₃), поэтому
+    не-ASCII строки без десятичных цифр досматриваются через isdigit.
+    """
+    return _HAS_DIGIT(text) is not None or (not text.isascii() and any(map(str.isdigit, text)))
+
+
+@dataclass(slots=True)
 class StoreResult:
     """
     Результат Stage 5: Store Detection.
@@ -82,42 +100,106 @@ class StoreDetectionStage:
         """
         self.config_loader = config_loader or ConfigLoader()
         self.scan_limit = scan_limit
+        self._configs_cache: Dict[str, Optional[LocaleConfig]] = {}
         self._stores_cache: Dict[str, List[StoreDetectionConfig]] = {}
-        self._address_hints_cache: Dict[str, List[str]] = {}
+        self._store_keywords_cache: Dict[str, Tuple[Tuple[str, str, str, float], ...]] = {}
+        self._address_patterns_cache: Dict[str, Tuple[Optional[re.Pattern[str]], Optional[re.Pattern[str]]]] = {}
         self._custom_address_hints = address_hints
     
-    def _get_stores_for_locale(self, locale_code: str) -> List[StoreDetectionConfig]:
-        """Получает список магазинов для локали из кеша или загружает."""
-        if locale_code not in self._stores_cache:
+    def _load_config(self, locale_code: str) -> Optional[LocaleConfig]:
+        """Конфиг локали, загруженный один раз на стадию (None если конфига нет)."""
+        if locale_code not in self._configs_cache:
             try:
-                config = self.config_loader.load(locale_code)
-                self._stores_cache[locale_code] = config.stores
+                self._configs_cache[locale_code] = self.config_loader.load(locale_code)
             except FileNotFoundError:
                 logger.warning(f"[Stage 5: Store] Конфиг для {locale_code} не найден")
-                self._stores_cache[locale_code] = []
+                self._configs_cache[locale_code] = None
+        return self._configs_cache[locale_code]
+    
+    def _get_stores_for_locale(self, locale_code: str) -> List[StoreDetectionConfig]:
+        """Получает список магазинов для локали из кеша или загружает."""
+        if locale_code not in self._stores_cache:
+            config = self._load_config(locale_code)
+            self._stores_cache[locale_code] = config.stores if config else []
         return self._stores_cache[locale_code]
     
+    def _get_store_keywords(self, locale_code: str) -> Tuple[Tuple[str, str, str, float], ...]:
+        """
+        Плоская таблица поиска магазинов локали: (keyword_lower, store_name, kind, confidence).
+        
+        Порядок совпадает с порядком проверки: магазины как в конфиге,
+        у каждого сначала brands (1.0), затем aliases (0.9).
+        
+        Исключение — слово, которое целиком содержит более раннее слово другого
+        магазина ('marktkauf edeka' и 'edeka', 'rewe center' и 'e center'):
+        оно переносится перед ним, иначе короткое слово всегда перехватывает строку.
+        Перенос не делается, если тот магазин сам перечисляет это же или более
+        длинное слово ('auchan retail portugal' есть и у auchan, и у jumbo).
+        Перенос меняет только порядок проверки, confidence слова остаётся своим.
+        """
+        keywords = self._store_keywords_cache.get(locale_code)
+        if keywords is None:
+            entries: List[Tuple[str, str, str, float]] = []
+            store_keywords: Dict[str, List[str]] = {}
+            for store_config in self._get_stores_for_locale(locale_code):
+                brands = [brand.lower() for brand in store_config.brands]
+                aliases = [alias.lower() for alias in store_config.aliases]
+                entries.extend((brand, store_config.name, "brand", 1.0) for brand in brands)
+                entries.extend((alias, store_config.name, "alias", 0.9) for alias in aliases)
+                store_keywords[store_config.name] = brands + aliases
+            
+            def order_key(k: int) -> Tuple[int, int, int]:
+                """Перенесённое слово встаёт перед вытесненным (длинные раньше), остальные — на своё место."""
+                keyword, store_name = entries[k][0], entries[k][1]
+                for j in range(k):
+                    other_keyword, other_store = entries[j][0], entries[j][1]
+                    if (
+                        other_store != store_name
+                        and other_keyword in keyword
+                        and not any(keyword in kw for kw in store_keywords[other_store])
+                    ):
+                        return j, 0, -len(keyword)
+                return k, 1, 0
+            
+            keywords = tuple(entries[k] for k in sorted(range(len(entries)), key=order_key))
+            self._store_keywords_cache[locale_code] = keywords
+        return keywords
+    
     def _get_address_hints(self, locale_code: str) -> List[str]:
         """Получает признаки адреса для локали из конфига."""
         if self._custom_address_hints:
             return self._custom_address_hints
         
-        if locale_code not in self._address_hints_cache:
-            try:
-                config = self.config_loader.load(locale_code)
-                hints = config.address_hints if config.address_hints else []
-                self._address_hints_cache[locale_code] = hints
-            except FileNotFoundError:
-                self._address_hints_cache[locale_code] = []
-        return self._address_hints_cache[locale_code]
+        config = self._load_config(locale_code)
+        return config.address_hints if config and config.address_hints else []
     
     def _get_non_address_hints(self, locale_code: str) -> List[str]:
         """Получает признаки НЕ адреса для локали из конфига."""
-        try:
-            config = self.config_loader.load(locale_code)
-            return config.non_address_hints if config.non_address_hints else []
-        except FileNotFoundError:
-            return []
+        config = self._load_config(locale_code)
+        return config.non_address_hints if config and config.non_address_hints else []
+    
+    def _get_address_patterns(self, locale_code: str) -> Tuple[Optional[re.Pattern[str]], Optional[re.Pattern[str]]]:
+        """
+        Признаки адреса локали одной регуляркой каждый (с кешированием).
+        
+        Returns:
+            (address_re, non_address_re): признаки адреса и исключения
+            (из конфига плюс базовые BASE_NON_ADDRESS_HINTS)
+        """
+        patterns = self._address_patterns_cache.get(locale_code)
+        if patterns is None:
+            patterns = (
+                compile_keywords(self._get_address_hints(locale_code)),
+                compile_keywords(self._get_non_address_hints(locale_code) + BASE_NON_ADDRESS_HINTS),
+            )
+            self._address_patterns_cache[locale_code] = patterns
+        return patterns
+    
+    def warmup(self, locale_codes: Sequence[str]) -> None:
+        """Заранее собирает таблицы поиска магазинов и признаки адреса локалей."""
+        for locale_code in locale_codes:
+            self._get_store_keywords(locale_code)
+            self._get_address_patterns(locale_code)
     
     def process(self, layout: LayoutResult, locale: LocaleResult) -> StoreResult:
         """
@@ -132,73 +214,24 @@ class StoreDetectionStage:
         """
         logger.debug(f"[Stage 5: Store] Поиск магазина для локали {locale.locale_code}")
         
-        # 1. Загружаем магазины из конфига (с кешированием)
-        stores = self._get_stores_for_locale(locale.locale_code)
-        
         # Сканируем первые N строк
         lines_to_scan = layout.lines[:self.scan_limit]
         
-        store_name = None
-        matched_line = -1
-        confidence = 0.0
-        
-        # 2. Ищем по brands и aliases из конфига
-        for i, line in enumerate(lines_to_scan):
-            line_lower = line.text.lower()
-            
-            for store_config in stores:
-                # Ищем brands (высокий confidence)
-                for brand in store_config.brands:
-                    if brand.lower() in line_lower:
-                        store_name = store_config.name
-                        matched_line = i
-                        confidence = 1.0
-                        logger.info(f"[Stage 5: Store] Найден магазин по brand: {store_name} (строка {i}, brand='{brand}')")
-                        break
-                
-                if store_name:
-                    break
-                
-                # Ищем aliases (пониженный confidence)
-                for alias in store_config.aliases:
-                    if alias.lower() in line_lower:
-                        store_name = store_config.name
-                        matched_line = i
-                        confidence = 0.9
-                        logger.info(f"[Stage 5: Store] Найден магазин по alias: {store_name} (строка {i}, alias='{alias}')")
-                        break
-                
-                if store_name:
-                    break
-            
-            if store_name:
-                break
-        
-        # 3. Fallback на глобальные бренды (если не найден в локальных конфигах)
-        if not store_name:
-            for i, line in enumerate(lines_to_scan):
-                line_lower = line.text.lower()
-                for global_brand in GLOBAL_STORES:
-                    if global_brand in line_lower:
-                        store_name = global_brand
-                        matched_line = i
-                        confidence = 0.7  # Ниже confidence для глобального fallback
-                        logger.info(f"[Stage 5: Store] Найден глобальный магазин: {store_name} (строка {i})")
-                        break
-                if store_name:
-                    break
+        # 1-3. Магазин из конфига локали, иначе глобальный бренд
+        store_name, matched_line, confidence = self._find_store(
+            lines_to_scan, locale.locale_code
+        )
         
         # 4. Пробуем извлечь адрес (строки после названия магазина)
         store_address = None
         if matched_line >= 0 and matched_line + 1 < len(lines_to_scan):
             address_lines = []
-            address_hints = self._get_address_hints(locale.locale_code)
-            non_address_hints = self._get_non_address_hints(locale.locale_code)
+            address_re, non_address_re = self._get_address_patterns(locale.locale_code)
             
             for j in range(matched_line + 1, min(matched_line + 4, len(lines_to_scan))):
-                line_text = layout.lines[j].text
-                if self._looks_like_address(line_text, address_hints, non_address_hints):
-                    address_lines.append(line_text)
+                line = layout.lines[j]
+                if self._looks_like_address(line, address_re, non_address_re):
+                    address_lines.append(line.text)
                 else:
                     break
             
@@ -217,37 +250,105 @@ class StoreDetectionStage:
         
         return result
     
-    def _looks_like_address(self, text: str, address_hints: List[str], non_address_hints: List[str]) -> bool:
+    def _find_store(
+        self, lines_to_scan: List[Line], locale_code: str
+    ) -> Tuple[Optional[str], int, float]:
         """
-        Проверяет, похожа ли строка на адрес.
+        Ищет магазин в строках чека.
         
-        Args:
-            text: Текст строки
-            address_hints: Признаки адреса (из конфига)
-            non_address_hints: Признаки НЕ адреса (из конфига)
+        Returns:
+            (store_name, matched_line, confidence);
+            (None, -1, 0.0) если магазин не найден
         """
-        text_lower = text.lower()
+        # Строки склеиваются в один буфер: каждое слово ищется одним find() по всем строкам
+        starts: List[int] = []
+        pos = 0
+        for line in lines_to_scan:
+            starts.append(pos)
+            pos += len(line.text_lower) + 1
+        buffer = "\n".join(line.text_lower for line in lines_to_scan)
         
-        # Базовые исключения (универсальные, всегда применяются)
-        base_non_address = ["€", "zł", "kč", "czk"]
+        # Brands и aliases из конфига (первое совпадение по порядку строк)
+        store_keywords = self._get_store_keywords(locale_code)
+        hit = self._scan_buffer(buffer, starts, [entry[0] for entry in store_keywords])
+        if hit:
+            k, _, matched_line = hit
+            keyword, store_name, kind, confidence = store_keywords[k]
+            logger.info(f"[Stage 5: Store] Найден магазин по {kind}: {store_name} (строка {matched_line}, {kind}='{keyword}')")
+            return store_name, matched_line, confidence
         
-        # Проверяем исключения из конфига
-        for hint in non_address_hints:
-            if hint in text_lower:
-                return False
+        # Fallback на глобальные бренды (ниже confidence)
+        global_hit = self._scan_buffer(buffer, starts, tuple(GLOBAL_STORES))
+        if global_hit:
+            _, store_name, matched_line = global_hit
+            logger.info(f"[Stage 5: Store] Найден глобальный магазин: {store_name} (строка {matched_line})")
+            return store_name, matched_line, 0.7
+        
+        return None, -1, 0.0
+    
+    @staticmethod
+    def _scan_buffer(
+        buffer: str,
+        starts: List[int],
+        keywords: Sequence[str],
+    ) -> Optional[Tuple[int, str, int]]:
+        """
+        Слово, найденное в самой ранней строке буфера (при равенстве — первое по порядку).
         
-        # Проверяем базовые исключения
-        for hint in base_non_address:
-            if hint in text_lower:
-                return False
+        Буфер — строки через перевод строки, starts — смещения их начал.
+        Сначала проверяется только первая строка (обычно магазин там, и лучше не найти).
+        Иначе поиск идёт по всему буферу и после каждой находки сужается до строк
+        выше неё: слово из той же строки проиграло бы более раннему по порядку.
+        Совпадение не пересекает границу строк (слова однострочные).
+        
+        Returns:
+            (номер слова, слово, номер строки) или None
+        """
+        if not starts:
+            return None
+        
+        first_end = starts[1] - 1 if len(starts) > 1 else len(buffer)
+        for k, keyword in enumerate(keywords):
+            if buffer.find(keyword, 0, first_end) != -1:
+                return k, keyword, 0
+        
+        best = None
+        end = len(buffer)
+        for k, keyword in enumerate(keywords):
+            idx = buffer.find(keyword, first_end, end)
+            if idx != -1:
+                line_idx = bisect_right(starts, idx) - 1
+                best = (k, keyword, line_idx)
+                end = starts[line_idx] - 1
+        return best
+    
+    def _looks_like_address(
+        self,
+        line: Line,
+        address_re: Optional[re.Pattern[str]],
+        non_address_re: Optional[re.Pattern[str]],
+    ) -> bool:
+        """
+        Проверяет, похожа ли строка на адрес.
+        
+        Args:
+            line: Строка чека
+            address_re: Признаки адреса (из конфига)
+            non_address_re: Признаки НЕ адреса (из конфига и базовые)
+        """
+        text = line.text
+        text_lower = line.text_lower
+        
+        # Проверяем исключения (из конфига и базовые)
+        if non_address_re is not None and non_address_re.search(text_lower):
+            return False
         
         # Проверяем признаки адреса из конфига
-        for hint in address_hints:
-            if hint in text_lower:
-                return True
+        if address_re is not None and address_re.search(text_lower):
+            return True
         
         # Если короткая строка с цифрами — возможно это индекс/номер дома
-        if len(text) < 50 and any(c.isdigit() for c in text):
+        if len(text) < 50 and _has_digit(text):
             return True
         
         return False
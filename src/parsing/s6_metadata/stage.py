@@ -13,10 +13,11 @@ Output: MetadataResult (дата, сумма, валюта)
 """
 
 import re
-import math
+from functools import lru_cache
+from math import log10
 from dataclasses import dataclass, field
 from datetime import datetime, date
-from typing import Dict, List, Optional, Tuple, Any
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
 from loguru import logger
 
 from ..s3_layout.stage import LayoutResult
@@ -25,6 +26,108 @@ from ..s5_store_detection.stage import StoreResult
 from ..locales.config_loader import ConfigLoader, ParsingConfig
 
 
+# Веса ключевых слов для выбора итоговой суммы (Confidence Scoring),
+# от сильных к слабым: строка получает вес первого класса, слово которого в ней есть.
+STRONG_KEYWORDS = ('summe', 'total', 'zahlbetrag', 'gesamtbetrag', 'zu zahlen', 'brutto', 'amount due')
+WEAK_KEYWORDS = ('betrag', 'gesamt', 'eur', 'euro', '€', 'pay')
+COMPONENT_KEYWORDS = ('netto', 'mwst', 'vat', 'iva', 'tax', 'steuer', 'net', 'ptu')
+
+_KEYWORD_WEIGHTS: Tuple[Tuple[Tuple[str, ...], float], ...] = (
+    (STRONG_KEYWORDS, 100.0),
+    (WEAK_KEYWORDS, 20.0),
+    (COMPONENT_KEYWORDS, -50.0),
+)
+
+
+def _keyword_score(line_lower: str) -> float:
+    """Вес строки-кандидата по самому сильному классу ключевых слов (0.0 если нет)."""
+    for keywords, weight in _KEYWORD_WEIGHTS:
+        for kw in keywords:
+            if kw in line_lower:
+                return weight
+    return 0.0
+
+
+# Паттерны дат (логика, не данные)
+DATE_PATTERNS: Dict[str, List[str]] = {
+    "de_DE": [
+        r"(\d{2})\.(\d{2})\.(\d{4})",    # 31.12.2024
+        r"(\d{2})\.(\d{2})\.(\d{2})",    # 31.12.24
+        r"(\d{4})-(\d{2})-(\d{2})",      # 2024-12-31 (иногда в Lidl)
+    ],
+    "pl_PL": [
+        r"(\d{4})-(\d{2})-(\d{2})",      # 2024-12-31 (ISO)
+        r"(\d{2})\.(\d{2})\.(\d{4})",    # 31.12.2024
+        r"(\d{2})-(\d{2})-(\d{4})",      # 31-12-2024
+    ],
+    "es_ES": [
+        r"(\d{2})/(\d{2})/(\d{4})",      # 31/12/2024
+        r"(\d{2})\.(\d{2})\.(\d{4})",    # 31.12.2024
+    ],
+    "pt_PT": [
+        r"(\d{2})/(\d{2})/(\d{4})",      # 31/12/2024
+        r"(\d{2})-(\d{2})-(\d{4})",      # 31-12-2024
+    ],
+    "default": [
+        r"(\d{2})\.(\d{2})\.(\d{4})",    # 31.12.2024
+        r"(\d{2})/(\d{2})/(\d{4})",      # 31/12/2024
+        r"(\d{4})-(\d{2})-(\d{2})",      # 2024-12-31 (ISO)
+    ],
+}
+
+
+# Паттерн цены итоговой суммы (валюта после числа необязательна).
+# Отдельный паттерн "валюта перед числом" не нужен: его число с теми же
+# границами всегда находит и этот паттерн.
+# Паттерн начинается с \d, а граница слева проверяется lookbehind после первой
+# цифры (эквивалент (?<![\d.,])(\d+)) — движок сразу пропускает позиции без цифр,
+# и строки без цифр отсеиваются без отдельной проверки.
+_PRICE_RE = re.compile(r"(\d(?<![\d.,]\d)\d*)[,.](\d{2})(?![\d.,])\s*(?:EUR|€|PLN|zł|CZK|Kč)?", re.IGNORECASE)
+
+
+def _valid_date(year: int, month: int, day: int) -> Optional[date]:
+    """Дата чека, если она в допустимом диапазоне (ValueError для несуществующего дня)."""
+    if 1 <= month <= 12 and 1 <= day <= 31 and 2020 <= year <= 2030:
+        return date(year, month, day)
+    return None
+
+
+def _parse_iso_date(match: re.Match[str]) -> Optional[date]:
+    """ISO формат (YYYY-MM-DD)."""
+    return _valid_date(int(match[1]), int(match[2]), int(match[3]))
+
+
+def _parse_european_date(match: re.Match[str]) -> Optional[date]:
+    """Европейский формат (DD.MM.YYYY или DD/MM/YYYY), короткий год 24 -> 2024."""
+    year = int(match[3])
+    if year < 100:
+        year += 2000
+    return _valid_date(year, int(match[2]), int(match[1]))
+
+
+@lru_cache(maxsize=None)
+def _date_patterns_for(
+    locale_code: str,
+) -> Tuple[Tuple[Tuple[re.Pattern[str], Callable[[re.Match[str]], Optional[date]]], ...], re.Pattern[str]]:
+    """
+    Скомпилированные паттерны дат локали — один раз на процесс, а не на экземпляр стадии.
+    
+    Returns:
+        (patterns, date_filter): паттерны локали, затем дефолтные (без дублей),
+        каждый со своим парсером (порядок полей ISO или европейский), и их
+        объединение для отсева строк без даты.
+        Все даты начинаются с двух цифр — lookahead объединения отбрасывает
+        прочие позиции сразу, не пробуя каждую альтернативу.
+    """
+    raw_patterns = dict.fromkeys(DATE_PATTERNS[locale_code] + DATE_PATTERNS["default"])
+    patterns = tuple(
+        (re.compile(p), _parse_iso_date if p.startswith(r"(\d{4})") else _parse_european_date)
+        for p in raw_patterns
+    )
+    date_filter = re.compile(r"(?=\d\d)(?:" + "|".join(raw_patterns) + ")")
+    return patterns, date_filter
+
+
 @dataclass
 class MetadataResult:
     """
@@ -59,32 +162,8 @@ class MetadataStage:
     Загружает конфигурацию локали (ключевые слова для итоговой суммы, валюта).
     """
     
-    # Паттерны дат (логика, не данные)
-    DATE_PATTERNS: Dict[str, List[str]] = {
-        "de_DE": [
-            r"(\d{2})\.(\d{2})\.(\d{4})",    # 31.12.2024
-            r"(\d{2})\.(\d{2})\.(\d{2})",    # 31.12.24
-            r"(\d{4})-(\d{2})-(\d{2})",      # 2024-12-31 (иногда в Lidl)
-        ],
-        "pl_PL": [
-            r"(\d{4})-(\d{2})-(\d{2})",      # 2024-12-31 (ISO)
-            r"(\d{2})\.(\d{2})\.(\d{4})",    # 31.12.2024
-            r"(\d{2})-(\d{2})-(\d{4})",      # 31-12-2024
-        ],
-        "es_ES": [
-            r"(\d{2})/(\d{2})/(\d{4})",      # 31/12/2024
-            r"(\d{2})\.(\d{2})\.(\d{4})",    # 31.12.2024
-        ],
-        "pt_PT": [
-            r"(\d{2})/(\d{2})/(\d{4})",      # 31/12/2024
-            r"(\d{2})-(\d{2})-(\d{4})",      # 31-12-2024
-        ],
-        "default": [
-            r"(\d{2})\.(\d{2})\.(\d{4})",    # 31.12.2024
-            r"(\d{2})/(\d{2})/(\d{4})",      # 31/12/2024
-            r"(\d{4})-(\d{2})-(\d{2})",      # 2024-12-31 (ISO)
-        ],
-    }
+    # Паттерны дат (общие для всех экземпляров, см. DATE_PATTERNS)
+    DATE_PATTERNS = DATE_PATTERNS
     
     def __init__(
         self,
@@ -99,6 +178,11 @@ class MetadataStage:
         
         self.config_loader = config_loader
     
+    def warmup(self, locale_codes: Sequence[str]) -> None:
+        """Заранее компилирует паттерны дат локалей."""
+        for locale_code in locale_codes:
+            _date_patterns_for(locale_code if locale_code in DATE_PATTERNS else "default")
+    
     def process(
         self,
         layout: LayoutResult,
@@ -151,18 +235,22 @@ class MetadataStage:
         """
         Извлекает дату из чека.
         """
-        # 1. Сначала пробуем локальные паттерны
-        locale_patterns = self.DATE_PATTERNS.get(locale_code or "default", [])
-        # 2. Потом дефолтные
-        default_patterns = self.DATE_PATTERNS.get("default", [])
-        all_patterns = list(dict.fromkeys(locale_patterns + default_patterns))
+        # Локальные паттерны, потом дефолтные (для неизвестной локали — только дефолтные)
+        all_patterns, date_filter = _date_patterns_for(
+            locale_code if locale_code in DATE_PATTERNS else "default"
+        )
+        has_date = date_filter.search
 
         for line in layout.lines:
-            for pattern in all_patterns:
-                match = re.search(pattern, line.text)
+            # Строка без единого совпадения — не перебираем паттерны по одному
+            if not has_date(line.text):
+                continue
+            # Приоритет паттернов важнее позиции в строке: перебор по порядку
+            for pattern, parse in all_patterns:
+                match = pattern.search(line.text)
                 if match:
                     try:
-                        parsed_date = self._parse_date_match(match, pattern)
+                        parsed_date = parse(match)
                         if parsed_date:
                             return parsed_date, match.group(0)
                     except ValueError:
@@ -170,111 +258,77 @@ class MetadataStage:
         
         return None, None
     
-    def _parse_date_match(self, match: re.Match, pattern: str) -> Optional[date]:
-        """Парсит найденную дату в зависимости от паттерна."""
-        groups = match.groups()
-        
-        # ISO формат (YYYY-MM-DD)
-        if pattern.startswith(r"(\d{4})"):
-            year, month, day = int(groups[0]), int(groups[1]), int(groups[2])
-        # Европейский формат (DD.MM.YYYY или DD/MM/YYYY)
-        else:
-            day, month, year = int(groups[0]), int(groups[1]), int(groups[2])
-            # Короткий год (24 -> 2024)
-            if year < 100:
-                year += 2000
-        
-        # Валидация
-        if 1 <= month <= 12 and 1 <= day <= 31 and 2020 <= year <= 2030:
-            return date(year, month, day)
-        
-        return None
-    
     def _extract_total(
         self, layout: LayoutResult, config: ParsingConfig
     ) -> Tuple[Optional[float], Optional[str], int]:
         """
         Извлекает итоговую сумму.
         """
-        keywords = config.total_keywords
-        total_lines = len(layout.lines)
+        # Ключевые слова уже приведены к нижнему регистру при загрузке конфига
+        keywords = config.metadata.total_keywords_lower
+        lines = layout.lines
+        total_lines = len(lines)
+        # Вес позиции: (i / total_lines) * 50 — множитель считается один раз
+        position_scale = 50.0 / max(1, total_lines)
         
-        # Собираем кандидатов с ключевыми словами
-        candidates: List[Tuple[float, str, int]] = []
-        for i, line in enumerate(layout.lines):
-            line_lower = line.text.lower()
+        # Кандидаты оцениваются сразу, без промежуточного списка.
+        # Шумовые skip_keywords здесь не нужны: их проверяли только в строках без
+        # ключевого слова суммы, а такие строки и так не дают кандидата.
+        best: Optional[Tuple[float, Optional[str], int, float]] = None
+        # Строки, где цена уже искалась (до fallback доходят только без цены > 0)
+        priced_lines: Set[int] = set()
+        for i, line in enumerate(lines):
+            # Нижний регистр строки считается один раз в Stage 3 (Line.text_lower)
+            line_lower = line.text_lower
             
-            # Пропускаем строки с "сильным" шумом
-            has_total_keyword = any(tk.lower() in line_lower for tk in keywords)
-            
-            is_noise = False
-            if not has_total_keyword:
-                for skw in config.semantic.skip_keywords:
-                    skw_lower = skw.lower()
-                    if skw_lower in line_lower and skw_lower not in [tk.lower() for tk in keywords]:
-                        is_noise = True
-                        break
+            keyword = next((kw for kw in keywords if kw in line_lower), None)
+            if keyword is None:
+                continue
             
-            if is_noise:
+            total, raw = self._extract_price_from_line(line.text)
+            priced_lines.add(i)
+            if total is None or total <= 0:
                 continue
-
-            for keyword in keywords:
-                if keyword in line_lower:
-                    total, raw = self._extract_price_from_line(line.text)
-                    if total is not None and total > 0:
-                        candidates.append((total, raw, i))
-                        logger.debug(f"[Stage 6] Кандидат: '{line.text}' -> {total} (keyword: {keyword})")
-                    break
-        
-        # Системное решение: Весовая логика (Confidence Scoring)
-        STRONG_KEYWORDS = {'summe', 'total', 'zahlbetrag', 'gesamtbetrag', 'zu zahlen', 'brutto', 'amount due'}
-        WEAK_KEYWORDS = {'betrag', 'gesamt', 'eur', 'euro', '€', 'pay'}
-        COMPONENT_KEYWORDS = {'netto', 'mwst', 'vat', 'iva', 'tax', 'steuer', 'net', 'ptu'}
-
-        scored_candidates: List[Tuple[float, str, int, float]] = []
-
-        for total, raw, i in candidates:
-            score = 0.0
-            line_text_lower = layout.lines[i].text.lower()
+            logger.debug(f"[Stage 6] Кандидат: '{line.text}' -> {total} (keyword: {keyword})")
             
+            # Системное решение: Весовая логика (Confidence Scoring)
             # 1. Вес по ключевым словам
-            if any(kw in line_text_lower for kw in STRONG_KEYWORDS):
-                score += 100.0
-            elif any(kw in line_text_lower for kw in WEAK_KEYWORDS):
-                score += 20.0
-            elif any(kw in line_text_lower for kw in COMPONENT_KEYWORDS):
-                score -= 50.0
+            score = _keyword_score(line_lower)
             
             # 2. Вес по позиции (ниже = лучше)
-            position_score = (i / total_lines) * 50.0
+            position_score = i * position_scale
             score += position_score
 
             # 3. Вес по размеру (Magnitude)
-            magnitude_score = math.log10(max(1.0, total)) * 10.0
+            magnitude_score = log10(max(1.0, total)) * 10.0
             score += magnitude_score
 
-            scored_candidates.append((total, raw, i, score))
             logger.debug(
-                f"[Stage 6] Candidate Score: {score:.1f} for '{layout.lines[i].text}' "
+                f"[Stage 6] Candidate Score: {score:.1f} for '{line.text}' "
                 f"(total={total}, kW={score-position_score-magnitude_score:.0f}, "
                 f"pos={position_score:.1f}, mag={magnitude_score:.1f})"
             )
+            # При равных очках остаётся первый кандидат (как max по списку)
+            if best is None or score > best[3]:
+                best = (total, raw, i, score)
 
-        if scored_candidates:
-            best = max(scored_candidates, key=lambda x: x[3])
+        if best:
             logger.debug(f"[Stage 6] Systemic Choice: {best[0]} (Score: {best[3]:.1f}) from line {best[2]}")
             return best[0], best[1], best[2]
         
         # Fallback: наибольшая сумма в нижней трети
         logger.debug("[Stage 6] Fallback: Score-based search in lower third")
         lower_third_start = total_lines * 2 // 3
-        best_fallback: Optional[Tuple[float, str, int, float]] = None
+        best_fallback: Optional[Tuple[float, Optional[str], int, float]] = None
         
-        for i in range(lower_third_start, total_lines):
-            total, raw = self._extract_price_from_line(layout.lines[i].text)
+        for i, line in enumerate(lines[lower_third_start:], lower_third_start):
+            # Повторный поиск дал бы ту же цену: None или <= 0, что fallback и так отбросит
+            if i in priced_lines:
+                continue
+            total, raw = self._extract_price_from_line(line.text)
             if total is not None and total > 1.0:
-                pos_score = (i / total_lines) * 50.0
-                mag_score = math.log10(total) * 10.0
+                pos_score = i * position_scale
+                mag_score = log10(total) * 10.0
                 score = pos_score + mag_score
                 if best_fallback is None or score > best_fallback[3]:
                     best_fallback = (total, raw, i, score)
@@ -287,19 +341,8 @@ class MetadataStage:
     
     def _extract_price_from_line(self, text: str) -> Tuple[Optional[float], Optional[str]]:
         """Извлекает цену из строки."""
-        patterns = [
-            r"(?<![\d.,])(\d+)[,.](\d{2})(?![\d.,])\s*(?:EUR|€|PLN|zł|CZK|Kč)?",
-            r"(?:EUR|€|PLN|zł)\s*(?<![\d.,])(\d+)[,.](\d{2})(?![\d.,])",
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                try:
-                    groups = match.groups()
-                    price = float(f"{groups[0]}.{groups[1]}")
-                    return price, match.group(0)
-                except (ValueError, IndexError):
-                    continue
+        match = _PRICE_RE.search(text)
+        if match:
+            return float(f"{match.group(1)}.{match.group(2)}"), match.group(0)
         
         return None, None
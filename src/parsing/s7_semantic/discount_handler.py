@@ -7,7 +7,7 @@ SRP: Только классификация скидок/залогов, без
 """
 
 import re
-from typing import List
+from typing import List, Optional
 from loguru import logger
 
 
@@ -20,14 +20,26 @@ class DiscountHandler:
     
     # Ключевые слова для залогов (Pfand/Leergut)
     PFAND_KEYWORDS = ["pfand", "leergut"]
+    _PFAND_RE = re.compile("|".join(PFAND_KEYWORDS), re.IGNORECASE)
     
-    def is_discount(self, text: str, discount_keywords: List[str]) -> bool:
+    # Отрицательная цена в конце строки: минус, пробелы (опционально), число с запятой/точкой
+    _NEGATIVE_PRICE_RE = re.compile(r"-\s*\d+[,\.]\d{2}\s*$")
+    
+    def is_discount(
+        self, 
+        text: str, 
+        discount_keywords: List[str], 
+        discount_re: Optional[re.Pattern[str]] = None,
+        check_pfand: bool = True
+    ) -> bool:
         """
         Определяет, является ли строка скидкой.
         
         Args:
             text: Текст строки
             discount_keywords: Список ключевых слов для скидок (из конфига)
+            discount_re: Те же слова одной альтернацией (SemanticConfig.discount_keywords_re)
+            check_pfand: False, если вызывающий уже проверил is_pfand
             
         Returns:
             True если строка является скидкой
@@ -35,11 +47,14 @@ class DiscountHandler:
         text_lower = text.lower()
         
         # Залог (Pfand) - это НЕ скидка
-        if self.is_pfand(text):
+        if check_pfand and self.is_pfand(text):
             return False
         
         # Проверка по ключевым словам из конфига
-        if any(kw in text_lower for kw in discount_keywords):
+        if discount_re is not None:
+            if discount_re.search(text_lower):
+                return True
+        elif any(kw in text_lower for kw in discount_keywords):
             return True
         
         # Проверка на отрицательную цену в конце строки
@@ -58,8 +73,7 @@ class DiscountHandler:
         Returns:
             True если строка является залогом
         """
-        text_lower = text.lower()
-        return any(keyword in text_lower for keyword in self.PFAND_KEYWORDS)
+        return self._PFAND_RE.search(text) is not None
     
     def has_negative_price(self, text: str) -> bool:
         """
@@ -73,6 +87,4 @@ class DiscountHandler:
         Returns:
             True если найдена отрицательная цена в конце
         """
-        # Паттерн: минус, пробелы (опционально), число с запятой/точкой, конец строки
-        pattern = r"-\s*\d+[,\.]\d{2}\s*$"
-        return bool(re.search(pattern, text))
+        return self._NEGATIVE_PRICE_RE.search(text) is not None
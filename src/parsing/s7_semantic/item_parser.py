@@ -17,6 +17,17 @@ from contracts.d1_extraction_dto import Word
 from .price_extractor import PriceExtractor
 from .discount_handler import DiscountHandler
 
+# stage.py импортирует этот модуль, поэтому ParsedItem берём через ссылку
+# на модуль (атрибут разрешается при вызове, когда stage уже загружен)
+from . import stage as _stage
+
+
+# Скомпилированные паттерны (компилируются один раз при импорте)
+# Явный маркер умножения или налоговый маркер (VAT/IVA/PTU) — одним проходом
+_MULTI_MARKER_RE = re.compile(r"\*|[\s*x×X]\s+| VAT | IVA | PTU ", re.IGNORECASE)
+_LAST_PRICE_RE = re.compile(r"(?<![\d.,])\-?\d+[.,]\d{2}(?![\d.,])")
+_QTY_RE = re.compile(r"(?:^|\s)(\d{1,3}(?:[.,]\d{1,3})?)\s*[xX×*]\s*(?:\d|$)")
+
 
 class ItemParser:
     """
@@ -34,7 +45,7 @@ class ItemParser:
         self.price_extractor = price_extractor
         self.discount_handler = discount_handler
     
-    def parse(self, line: Line, config: SemanticConfig) -> List["ParsedItem"]:
+    def parse(self, line: Line, config: SemanticConfig) -> List["_stage.ParsedItem"]:
         """
         Парсит строку и возвращает список товаров.
         
@@ -45,14 +56,16 @@ class ItemParser:
         Returns:
             Список распарсенных товаров
         """
-        # Импортируем ParsedItem здесь, чтобы избежать циклических импортов
-        from .stage import ParsedItem
-        
         text = line.text
         
         # Извлекаем все цены
-        price_strings = self.price_extractor.extract_strings(text, allow_joined=config.allow_joined_prices)
-        prices = self.price_extractor.extract_all(text, allow_joined=config.allow_joined_prices)
+        prices, price_strings = self.price_extractor.extract_all_with_strings(
+            text, allow_joined=config.allow_joined_prices
+        )
+        
+        # Без цен товара нет (extract_components тоже ничего не найдёт)
+        if not prices:
+            return []
         
         # Если несколько цен - пробуем разделить строку
         if len(prices) >= 2:
@@ -61,21 +74,42 @@ class ItemParser:
                 return split_items
         
         # Обычный парсинг одной строки
-        name, quantity, price, total = self.extract_components(text, config)
+        return self._build_items(text, prices, price_strings, line.line_number, config)
+    
+    def _build_items(
+        self,
+        text: str,
+        prices: List[float],
+        price_strings: List[str],
+        line_number: int,
+        config: SemanticConfig
+    ) -> List["_stage.ParsedItem"]:
+        """
+        Собирает товар из строки с уже извлечёнными ценами (без попытки разделения).
+        
+        Returns:
+            Список из одного товара или пустой список
+        """
+        name, quantity, price, total = self.extract_components(
+            text, config, prices=prices, price_strings=price_strings
+        )
         
         if total is not None:
-            # Определяем, является ли это скидкой
-            is_discount = self.discount_handler.is_discount(name or text, config.discount_keywords)
+            # Определяем, является ли это скидкой (залог скидкой не бывает)
             is_pfand = self.discount_handler.is_pfand(name or text)
+            is_discount = not is_pfand and self.discount_handler.is_discount(
+                name or text, config.discount_keywords, config.discount_keywords_re,
+                check_pfand=False,
+            )
             
-            return [ParsedItem(
+            return [_stage.ParsedItem(
                 name=name or "",
                 quantity=quantity,
                 price=price,
                 total=total,
                 is_discount=is_discount,
                 is_pfand=is_pfand,
-                line_number=line.line_number,
+                line_number=line_number,
                 raw_text=text
             )]
         
@@ -88,7 +122,7 @@ class ItemParser:
         price_strings: List[str],
         line: Line,
         config: SemanticConfig
-    ) -> Optional[List["ParsedItem"]]:
+    ) -> Optional[List["_stage.ParsedItem"]]:
         """
         Пытается разделить строку с несколькими товарами.
         
@@ -102,11 +136,8 @@ class ItemParser:
         Returns:
             Список товаров или None если разделение не удалось
         """
-        from .stage import ParsedItem
-        
         # Проверка на явный маркер умножения
-        has_explicit_multi = bool(re.search(r"(\*|[\s*x×X]\s+)", text.upper())) or \
-                           any(op in text.upper() for op in [' VAT ', ' IVA ', ' PTU '])
+        has_explicit_multi = _MULTI_MARKER_RE.search(text) is not None
         
         # Проверка на паттерн весового товара
         weight_pattern = self.price_extractor.detect_weight_pattern(prices)
@@ -124,21 +155,36 @@ class ItemParser:
         if not should_split:
             return None
         
-        # Разделяем по последней цене
-        last_price_match = list(re.finditer(r"(?<![\d.,])\-?\d+[.,]\d{2}(?![\d.,])", text))[-1]
+        # Разделяем по последней цене (без материализации всех совпадений)
+        last_price_match = None
+        for last_price_match in _LAST_PRICE_RE.finditer(text):
+            pass
+        if last_price_match is None:
+            return None
         pos = last_price_match.start()
         
         part1, part2 = text[:pos].strip(), text[pos:].strip()
         logger.debug(f"[ItemParser] Multi-Price Split: '{part1}' | '{part2}'")
         
-        # Рекурсивно парсим обе части
-        line1 = Line(text=part1, words=[], y_position=line.y_position, line_number=line.line_number)
-        line2 = Line(text=part2, words=[], y_position=line.y_position, line_number=line.line_number)
+        # Правая часть начинается с последней строгой цены и других строгих цен
+        # не содержит — делить её нечего, собираем товар напрямую.
+        # В relaxed-режиме цены могут пересекать границу, там — полный parse.
+        if config.allow_joined_prices:
+            line2 = Line(text=part2, words=[], y_position=line.y_position, line_number=line.line_number)
+            res2 = self.parse(line2, config)
+        else:
+            prices2, price_strings2 = self.price_extractor.extract_all_with_strings(part2)
+            res2 = self._build_items(part2, prices2, price_strings2, line.line_number, config) if prices2 else []
+        
+        # Без правой части разделение не удалось — левую часть не разбираем
+        if not res2:
+            return None
         
+        # Левая часть может содержать несколько товаров — рекурсивно
+        line1 = Line(text=part1, words=[], y_position=line.y_position, line_number=line.line_number)
         res1 = self.parse(line1, config)
-        res2 = self.parse(line2, config)
         
-        if res1 and res2:
+        if res1:
             return res1 + res2
         
         return None
@@ -146,7 +192,9 @@ class ItemParser:
     def extract_components(
         self, 
         text: str, 
-        config: SemanticConfig
+        config: SemanticConfig,
+        prices: Optional[List[float]] = None,
+        price_strings: Optional[List[str]] = None
     ) -> Tuple[Optional[str], Optional[float], Optional[float], Optional[float]]:
         """
         Извлекает компоненты товара: name, quantity, price, total.
@@ -154,12 +202,17 @@ class ItemParser:
         Args:
             text: Текст строки
             config: Конфигурация семантики
+            prices: Уже извлечённые цены строки (из parse), чтобы не сканировать повторно
+            price_strings: Уже извлечённые строки цен (передаются вместе с prices)
             
         Returns:
             (name, quantity, price, total) - компоненты товара
         """
-        # Извлекаем цены
-        prices = self.price_extractor.extract_all(text, allow_joined=config.allow_joined_prices)
+        # Извлекаем цены (float и строки за один проход), если их не передали
+        if prices is None or price_strings is None:
+            prices, price_strings = self.price_extractor.extract_all_with_strings(
+                text, allow_joined=config.allow_joined_prices
+            )
         
         if not prices:
             return None, None, None, None
@@ -169,7 +222,6 @@ class ItemParser:
         
         # Удаляем цены из текста, чтобы получить название
         name = text
-        price_strings = self.price_extractor.extract_strings(text, allow_joined=config.allow_joined_prices)
         for price_str in price_strings:
             name = name.replace(price_str, "").strip()
         
@@ -179,8 +231,7 @@ class ItemParser:
         quantity, price = None, None
         
         # Паттерн 1: Явный маркер умножения (1*5.99, 0.5 x 9.99)
-        qty_pattern = r"(?:^|\s)(\d{1,3}(?:[.,]\d{1,3})?)\s*[xX×*]\s*(?:\d|$)"
-        qty_match = re.search(qty_pattern, text)
+        qty_match = _QTY_RE.search(text)
         if qty_match:
             try:
                 quantity = float(qty_match.group(1).replace(",", "."))
@@ -211,18 +262,20 @@ class ItemParser:
         Returns:
             Очищенное название
         """
-        # Убираем маркеры умножения в конце
-        name = re.sub(r"[xX×]\s*$", "", name)
+        # Убираем маркер умножения в конце
+        stripped = name.rstrip()
+        if stripped and stripped[-1] in "xX×":
+            name = stripped[:-1]
         
         # Нормализуем пробелы
-        name = re.sub(r"\s+", " ", name)
+        name = " ".join(name.split())
         
         # Убираем лишние символы в начале/конце
-        name = re.sub(r"^[\s\-\*]+", "", name)
-        name = re.sub(r"[\s\-\*]+$", "", name).strip()
+        name = name.strip(" -*")
         
         # Убираем одиночные буквы налогов в конце (например, "A", "B", "C")
-        name = re.sub(r"\s+[A-Z]\s*$", "", name)
+        if len(name) >= 2 and name[-2] == " " and "A" <= name[-1] <= "Z":
+            name = name[:-2]
         
         return name
     
@@ -240,50 +293,63 @@ class ItemParser:
         Returns:
             Список разделенных строк
         """
-        if not line.words or len(line.words) < 2:
+        words = line.words
+        if not words or len(words) < 2:
             return [line]
         
-        # Сортируем слова по Y
-        sorted_words = sorted(line.words, key=lambda w: w.bounding_box.y)
+        # Быстрый путь: все Y в пределах threshold — кластер заведомо один
+        ys = line.word_ys
+        if max(ys) - min(ys) <= threshold:
+            return [line]
+        
+        # Сортируем слова по Y (индексы по уже извлечённым координатам)
+        order = sorted(range(len(words)), key=ys.__getitem__)
         
         # Группируем слова по Y (кластеры)
         clusters = []
-        current_cluster = [sorted_words[0]]
+        current_cluster = [words[order[0]]]
+        prev_y = ys[order[0]]
         
-        for i in range(1, len(sorted_words)):
-            w = sorted_words[i]
-            prev_w = current_cluster[-1]
+        for idx in order[1:]:
+            y = ys[idx]
             
             # Если разница Y больше threshold - новый кластер
-            if abs(w.bounding_box.y - prev_w.bounding_box.y) > threshold:
+            if y - prev_y > threshold:
                 clusters.append(current_cluster)
-                current_cluster = [w]
+                current_cluster = [words[idx]]
             else:
-                current_cluster.append(w)
+                current_cluster.append(words[idx])
+            prev_y = y
         
         clusters.append(current_cluster)
         
-        # Если только один кластер - не разделяем
-        if len(clusters) == 1:
-            return [line]
-        
         # Создаем новые строки из кластеров
         new_lines = []
         for cluster in clusters:
             # Сортируем слова в кластере по X
             sorted_cluster = sorted(cluster, key=lambda w: w.bounding_box.x)
             
-            # Собираем текст
-            text = " ".join([w.text for w in sorted_cluster])
+            # Геометрия и уверенность кластера — за один проход
+            # (кластер отсортирован по Y: первое слово — верхнее)
+            y_min = cluster[0].bounding_box.y
+            x_min = sorted_cluster[0].bounding_box.x
+            x_max = x_min
+            confidence_sum = 0.0
+            for w in cluster:
+                bbox = w.bounding_box
+                x_end = bbox.x + bbox.width
+                if x_end > x_max:
+                    x_max = x_end
+                confidence_sum += w.confidence
             
             # Создаем новую Line
             new_line = Line(
-                text=text,
+                text=" ".join([w.text for w in sorted_cluster]),
                 words=sorted_cluster,
-                y_position=min(w.bounding_box.y for w in cluster),
-                x_min=min(w.bounding_box.x for w in cluster),
-                x_max=max(w.bounding_box.x + w.bounding_box.width for w in cluster),
-                confidence=sum(w.confidence for w in cluster) / len(cluster),
+                y_position=y_min,
+                x_min=x_min,
+                x_max=x_max,
+                confidence=confidence_sum / len(sorted_cluster),
                 line_number=line.line_number
             )
             new_lines.append(new_line)
@@ -6,8 +6,8 @@ Line Classifier - Классификация строк чека.
 SRP: Только классификация строк, без парсинга товаров.
 """
 
-import re
-from typing import Tuple
+from bisect import bisect_right
+from typing import List, Optional, Set, Tuple
 from loguru import logger
 
 from ..s3_layout.stage import LayoutResult, Line
@@ -16,6 +16,16 @@ from ..s6_metadata.stage import MetadataResult
 from ..locales.config_loader import SemanticConfig
 
 
+# Налоговые ключевые слова футера (после итоговой суммы)
+_FOOTER_KEYWORDS = ('steuer', 'mwst', 'vat', 'ptu', 'netto', 'brutto')
+
+# Коды классификации строк товарной зоны (classify_batch)
+LINE_ITEM = 0       # Кандидат в товар
+LINE_HEADER = 1     # Заголовок (Header Protector)
+LINE_SKIP = 2       # Служебная строка
+LINE_FOOTER = 3     # Футер — дальше товаров нет
+
+
 class LineClassifier:
     """
     Классификатор строк чека.
@@ -23,44 +33,137 @@ class LineClassifier:
     ЦКП: Определение типа строки и границ товарной зоны.
     """
     
-    def should_skip(self, text: str, config: SemanticConfig) -> bool:
+    def should_skip(
+        self, 
+        text: str, 
+        config: SemanticConfig, 
+        text_lower: Optional[str] = None
+    ) -> bool:
         """
         Определяет, нужно ли пропустить строку (служебная/техническая).
         
         Args:
             text: Текст строки
             config: Конфигурация семантики
+            text_lower: text.lower(), если вызывающий уже посчитал его
             
         Returns:
             True если строку нужно пропустить
         """
-        text_lower = text.lower()
+        if text_lower is None:
+            text_lower = text.lower()
         
         # Пустые или очень короткие строки
-        if len(text.strip()) < 2:
+        text_stripped = text.strip()
+        if len(text_stripped) < 2:
             return True
         
-        # Проверка по skip_keywords из конфига
-        for keyword in config.skip_keywords:
-            if keyword in text_lower:
-                return True
+        # Проверка по skip_keywords из конфига (одна альтернация на все слова)
+        if config.skip_keywords_re is not None and config.skip_keywords_re.search(text_lower):
+            return True
         
+        return self._matches_skip_patterns(text, text_stripped, config)
+    
+    def _matches_skip_patterns(self, text: str, text_stripped: str, config: SemanticConfig) -> bool:
+        """Проверка по weight_patterns и tax_patterns из конфига."""
         # Проверка по weight_patterns (весовые товары)
-        for pattern in config.weight_patterns:
-            if re.search(pattern, text, re.IGNORECASE):
+        for regex in config.weight_regexes:
+            if regex.search(text):
                 return True
         
         # Проверка по tax_patterns (налоговые строки)
-        for pattern in config.tax_patterns:
-            if re.search(pattern, text.strip(), re.IGNORECASE):
+        for regex in config.tax_regexes:
+            if regex.search(text_stripped):
                 return True
         
         return False
     
+    def classify_batch(
+        self,
+        layout: LayoutResult,
+        start_line: int,
+        end_line: int,
+        metadata: MetadataResult,
+        config: SemanticConfig,
+        header_threshold: float
+    ) -> List[int]:
+        """
+        Классифицирует все строки товарной зоны за один проход.
+        
+        Результат совпадает с последовательными вызовами is_footer_line,
+        is_header_line и should_skip, но skip_keywords ищутся одним вызовом
+        регулярки по всему тексту зоны, а не по строке за раз.
+        
+        Args:
+            layout: Результат Layout stage
+            start_line: Первая строка товарной зоны
+            end_line: Последняя строка товарной зоны (включительно)
+            metadata: Результат Metadata stage
+            config: Конфигурация семантики
+            header_threshold: Граница верхней трети чека (см. header_threshold)
+            
+        Returns:
+            Коды LINE_* для строк start_line..end_line; список обрывается
+            на первом LINE_FOOTER
+        """
+        zone = layout.lines[start_line:end_line + 1]
+        keyword_hits = self._find_keyword_lines(zone, config)
+        
+        codes: List[int] = []
+        for offset, line in enumerate(zone):
+            text_lower = line.text_lower
+            
+            if self.is_footer_line(line, start_line + offset, metadata, text_lower):
+                codes.append(LINE_FOOTER)
+                break
+            
+            if self.is_header_line(line, header_threshold, config):
+                codes.append(LINE_HEADER)
+                continue
+            
+            text_stripped = line.text.strip()
+            if (
+                len(text_stripped) < 2
+                or offset in keyword_hits
+                or self._matches_skip_patterns(line.text, text_stripped, config)
+            ):
+                codes.append(LINE_SKIP)
+            else:
+                codes.append(LINE_ITEM)
+        
+        return codes
+    
+    def _find_keyword_lines(self, lines: List[Line], config: SemanticConfig) -> Set[int]:
+        """
+        Индексы строк, содержащих хотя бы одно skip-слово.
+        
+        Строки склеиваются через перевод строки, и finditer проходит буфер
+        один раз. Совпадение не может пересечь границу строк (ключевые слова
+        однострочные), а первое совпадение в каждой строке finditer находит всегда.
+        """
+        keywords_re = config.skip_keywords_re
+        if keywords_re is None or not lines:
+            return set()
+        
+        # Смещение начала каждой строки в общем буфере
+        starts: List[int] = []
+        pos = 0
+        for line in lines:
+            starts.append(pos)
+            pos += len(line.text_lower) + 1
+        
+        buffer = "\n".join(line.text_lower for line in lines)
+        return {bisect_right(starts, match.start()) - 1 for match in keywords_re.finditer(buffer)}
+    
+    @staticmethod
+    def header_threshold(layout: LayoutResult) -> float:
+        """Граница верхней трети чека (Y) — считается один раз на чек."""
+        return layout.image_height / 3
+    
     def is_header_line(
         self, 
         line: Line, 
-        layout: LayoutResult, 
+        header_threshold: float, 
         config: SemanticConfig
     ) -> bool:
         """
@@ -70,21 +173,25 @@ class LineClassifier:
         
         Args:
             line: Проверяемая строка
-            layout: Результат Layout stage
+            header_threshold: Граница верхней трети чека (см. header_threshold)
             config: Конфигурация семантики
             
         Returns:
             True если строка является заголовком
         """
+        # Без идентификаторов в конфиге заголовков нет
+        if config.legal_header_re is None:
+            return False
+        
         # Проверка позиции (верхняя треть чека)
-        if line.y_position >= layout.image_height / 3:
+        if line.y_position >= header_threshold:
             return False
         
         # Проверка по legal_header_identifiers из конфига
-        for identifier in config.legal_header_identifiers:
-            if identifier.lower() in line.text.lower():
-                logger.debug(f"[LineClassifier] Header detected: '{line.text}' (identifier: '{identifier}')")
-                return True
+        match = config.legal_header_re.search(line.text_lower)
+        if match:
+            logger.debug(f"[LineClassifier] Header detected: '{line.text}' (identifier: '{match.group(0)}')")
+            return True
         
         return False
     
@@ -92,7 +199,8 @@ class LineClassifier:
         self, 
         line: Line, 
         line_idx: int, 
-        metadata: MetadataResult
+        metadata: MetadataResult,
+        text_lower: Optional[str] = None
     ) -> bool:
         """
         Проверка на футер (Footer Protector).
@@ -103,6 +211,7 @@ class LineClassifier:
             line: Проверяемая строка
             line_idx: Индекс строки
             metadata: Результат Metadata stage
+            text_lower: line.text.lower(), если вызывающий уже посчитал его
             
         Returns:
             True если строка является футером
@@ -116,10 +225,10 @@ class LineClassifier:
             return False
         
         # Проверка на налоговые ключевые слова
-        footer_keywords = ['steuer', 'mwst', 'vat', 'ptu', 'netto', 'brutto']
-        line_lower = line.text.lower()
+        if text_lower is None:
+            text_lower = line.text_lower
         
-        if any(kw in line_lower for kw in footer_keywords):
+        if any(kw in text_lower for kw in _FOOTER_KEYWORDS):
             logger.debug(f"[LineClassifier] Footer detected: '{line.text}' (line {line_idx})")
             return True
         
@@ -18,11 +18,71 @@ class PriceExtractor:
     ЦКП: Корректные цены без аномалий.
     """
     
-    # Паттерн для извлечения цен (стандартный)
-    STANDARD_PATTERN = r"(?<![\d.,])(-?\d+)[.,](\d{2})(?=\s*($|[A-Z%€£$]|zł|Kč))"
+    # Паттерн для извлечения цен (стандартный).
+    # Целая часть — атомарная группа (re, Python 3.11+): откатываться в неё
+    # бессмысленно, за цифрами всё равно должен идти разделитель.
+    # Хвост в lookahead без захвата: findall возвращает пары (целая, копейки).
+    STANDARD_PATTERN = r"(?<![\d.,])((?>-?\d+))[.,](\d{2})(?=\s*(?:$|[A-Z%€£$]|zł|Kč))"
     
     # Паттерн для извлечения цен (relaxed - для склеенных цен)
-    RELAXED_PATTERN = r"(-?\d+)[.,](\d{2})(?=\s*($|[A-Z%€£$]|zł|Kč))"
+    RELAXED_PATTERN = r"((?>-?\d+))[.,](\d{2})(?=\s*(?:$|[A-Z%€£$]|zł|Kč))"
+    
+    # Скомпилированные паттерны (компилируются один раз при импорте)
+    _STANDARD_RE = re.compile(STANDARD_PATTERN)
+    _RELAXED_RE = re.compile(RELAXED_PATTERN)
+    _PRICE_STR_STRICT_RE = re.compile(r"(?<![\d.,])\-?\d+[.,]\d{2}(?![\d.,])")
+    _PRICE_STR_RELAXED_RE = re.compile(r"\-?\d+[.,]\d{2}")
+    
+    # Совмещённый паттерн: находит те же строки цен, что и _PRICE_STR_STRICT_RE,
+    # а группа 3 заполняется, если за ценой идёт "хвост" из STANDARD_PATTERN
+    # (только такие совпадения превращаются в float)
+    _FUSED_STRICT_RE = re.compile(
+        r"(?<![\d.,])(-?\d+)[.,](\d{2})(?![\d.,])(?=(\s*(?:$|[A-Z%€£$]|zł|Kč))?)"
+    )
+    
+    @staticmethod
+    def has_separator(text: str) -> bool:
+        """
+        Быстрая проверка перед регуляркой: любая цена содержит '.' или ','.
+        
+        Отсекает названия магазинов, адреса и пустые строки без запуска regex.
+        """
+        return "." in text or "," in text
+    
+    def extract_all_with_strings(
+        self, 
+        text: str, 
+        allow_joined: bool = False
+    ) -> Tuple[List[float], List[str]]:
+        """
+        Извлекает цены как float и как строки за один проход регулярки.
+        
+        Args:
+            text: Текст строки
+            allow_joined: Использовать relaxed паттерн для склеенных цен
+            
+        Returns:
+            (prices, price_strings) - то же, что extract_all и extract_strings
+        """
+        if not self.has_separator(text):
+            return [], []
+        
+        if allow_joined:
+            # RELAXED_PATTERN может найти цену внутри другой строки цены
+            # ("06.08.25" -> 8.25), поэтому здесь остаются два прохода
+            return self.extract_all(text, True), self.extract_strings(text, True)
+        
+        prices: List[float] = []
+        price_strings: List[str] = []
+        for match in self._FUSED_STRICT_RE.finditer(text):
+            price_strings.append(match[0])
+            if match[3] is not None:
+                try:
+                    prices.append(float(match[1] + "." + match[2]))
+                except ValueError:
+                    continue
+        
+        return prices, price_strings
     
     def extract_all(self, text: str, allow_joined: bool = False) -> List[float]:
         """
@@ -35,13 +95,16 @@ class PriceExtractor:
         Returns:
             Список найденных цен (float)
         """
-        pattern = self.RELAXED_PATTERN if allow_joined else self.STANDARD_PATTERN
-        matches = re.findall(pattern, text)
+        if not self.has_separator(text):
+            return []
+        
+        regex = self._RELAXED_RE if allow_joined else self._STANDARD_RE
+        matches = regex.findall(text)
         
         prices = []
         for match in matches:
             try:
-                price = float(f"{match[0]}.{match[1]}")
+                price = float(".".join(match))
                 prices.append(price)
             except (ValueError, IndexError):
                 continue
@@ -59,9 +122,11 @@ class PriceExtractor:
         Returns:
             Список строк цен (например, "12,34", "5.99")
         """
-        pattern = r"(?<![\d.,])\-?\d+[.,]\d{2}(?![\d.,])" if not allow_joined else r"\-?\d+[.,]\d{2}"
-        matches = re.findall(pattern, text)
-        return matches
+        if not self.has_separator(text):
+            return []
+        
+        regex = self._PRICE_STR_RELAXED_RE if allow_joined else self._PRICE_STR_STRICT_RE
+        return regex.findall(text)
     
     def validate(
         self, 
@@ -129,23 +194,22 @@ class PriceExtractor:
             return None
         
         # Нормализуем (запятая -> точка)
-        current_price_str = price_str.replace(',', '.')
+        normalized = price_str.replace(',', '.')
+        
+        # Если цена стала <= половины итога и вменяемая - берем!
+        max_price = receipt_total * 0.5
         
-        # Отсекаем цифры слева, пока цена не станет вменяемой
-        while len(current_price_str) > 3:  # Минимум X.XX
+        # Отсекаем цифры слева (сдвигом начала), пока цена не станет вменяемой.
+        # Минимум X.XX — последний кандидат длиной 4 символа.
+        for start in range(len(normalized) - 3):
             try:
-                candidate_price = float(current_price_str)
-                
-                # Если цена стала <= итога и вменяемая - берем!
-                threshold_multiplier = 0.5
-                if 0 < candidate_price <= receipt_total * threshold_multiplier:
-                    logger.debug(f"[PriceExtractor] Smart Cleaner: {price_str} -> {candidate_price}")
-                    return candidate_price
+                candidate_price = float(normalized[start:])
             except ValueError:
-                pass
+                continue
             
-            # Отсекаем одну цифру слева
-            current_price_str = current_price_str[1:]
+            if 0 < candidate_price <= max_price:
+                logger.debug(f"[PriceExtractor] Smart Cleaner: {price_str} -> {candidate_price}")
+                return candidate_price
         
         return None
     
@@ -169,16 +233,11 @@ class PriceExtractor:
         if len(prices) != 3:
             return None
         
-        try:
-            qty = prices[0]
-            unit_price = prices[1]
-            total = prices[2]
-            
-            # Проверка: qty < 10 (типичный вес), и qty * price ≈ total
-            if qty < 10 and abs(qty * unit_price - total) < 0.02:
-                logger.debug(f"[PriceExtractor] Weight Pattern: qty={qty}, price={unit_price}, total={total}")
-                return (qty, unit_price, total)
-        except (ValueError, IndexError):
-            pass
+        qty, unit_price, total = prices
+        
+        # Проверка: qty < 10 (типичный вес), и qty * price ≈ total
+        if qty < 10 and abs(qty * unit_price - total) < 0.02:
+            logger.debug(f"[PriceExtractor] Weight Pattern: qty={qty}, price={unit_price}, total={total}")
+            return (qty, unit_price, total)
         
         return None
@@ -14,23 +14,34 @@ Output: SemanticResult (items, discounts)
 5. Определение скидок (discount_handler)
 """
 
+import math
+import re
+import sys
+from collections import deque
 from dataclasses import dataclass, field
-from typing import List, Optional
+from datetime import datetime
+from typing import Deque, Dict, List, Optional, Sequence, Tuple
 from loguru import logger
 
+from contracts.d2_parsing_dto import RawReceiptItem
+
 from ..s3_layout.stage import LayoutResult, Line
 from ..s4_locale_detection.stage import LocaleResult
 from ..s5_store_detection.stage import StoreResult
 from ..s6_metadata.stage import MetadataResult
 from ..locales.config_loader import ConfigLoader, SemanticConfig, LocaleConfig
 
-from .line_classifier import LineClassifier
+from .line_classifier import LineClassifier, LINE_FOOTER, LINE_HEADER, LINE_SKIP
 from .price_extractor import PriceExtractor
 from .item_parser import ItemParser
 from .discount_handler import DiscountHandler
 
 
-@dataclass
+# "Название" только из цифр и разделителей (хотя бы одна цифра): 123, 1.234,56
+_NUMERIC_NAME_RE = re.compile(r"[.,]*\d[\d.,]*")
+
+
+@dataclass(slots=True)
 class ParsedItem:
     """Распарсенный товар."""
     name: str
@@ -53,9 +64,36 @@ class ParsedItem:
             "line_number": self.line_number,
             "raw_text": self.raw_text,
         }
+    
+    def to_raw_item(self, date: Optional[datetime]) -> RawReceiptItem:
+        """
+        Конвертирует товар в RawReceiptItem (контракт D2->D3).
+        
+        Значения уже проверены стадиями 7-8, поэтому model_construct без
+        повторной валидации; единственный валидатор контракта (quantity > 0)
+        проверяем сами, невалидные товары идут через обычный конструктор
+        и поднимают ValidationError.
+        """
+        if self.quantity is None or self.quantity > 0:
+            return RawReceiptItem.model_construct(
+                name=self.name,
+                quantity=self.quantity,
+                price=self.price,
+                total=self.total,
+                date=date,
+                raw_text=self.raw_text,
+            )
+        return RawReceiptItem(
+            name=self.name,
+            quantity=self.quantity,
+            price=self.price,
+            total=self.total,
+            date=date,
+            raw_text=self.raw_text,
+        )
 
 
-@dataclass
+@dataclass(slots=True)
 class SemanticResult:
     """
     Результат Stage 7: Semantic Extraction.
@@ -67,13 +105,23 @@ class SemanticResult:
     skipped_lines: int = 0
     parsed_lines: int = 0
     
+    # Кеш сумм: результат собирается один раз в конце Stage 7 и дальше
+    # только читается (Stage 8, to_dict), поэтому суммы считаются один раз
+    _items_total: Optional[float] = field(default=None, init=False, repr=False, compare=False)
+    _discounts_total: Optional[float] = field(default=None, init=False, repr=False, compare=False)
+    
     @property
     def items_total(self) -> float:
-        return sum(item.total or 0 for item in self.items if not item.is_discount)
+        if self._items_total is None:
+            # fsum: точная сумма без накопления ошибки float на длинных чеках
+            self._items_total = math.fsum([item.total or 0 for item in self.items if not item.is_discount])
+        return self._items_total
     
     @property
     def discounts_total(self) -> float:
-        return sum(abs(item.total or 0) for item in self.discounts)
+        if self._discounts_total is None:
+            self._discounts_total = math.fsum([abs(item.total or 0) for item in self.discounts])
+        return self._discounts_total
     
     def to_dict(self) -> dict:
         return {
@@ -110,6 +158,9 @@ class SemanticStage:
         self.config_loader = config_loader or ConfigLoader()
         self.config = config
         
+        # Семантические конфиги по (locale, store), включая fallback при ошибке загрузки
+        self._semantic_configs: Dict[Tuple[str, Optional[str]], SemanticConfig] = {}
+        
         # Инициализация модулей
         self.price_extractor = PriceExtractor()
         self.discount_handler = DiscountHandler()
@@ -119,6 +170,41 @@ class SemanticStage:
     def _empty_semantic_config(self) -> SemanticConfig:
         """Создает пустую конфигурацию для fallback."""
         return SemanticConfig(skip_keywords=[], discount_keywords=[], weight_patterns=[], tax_patterns=[])
+    
+    def _get_semantic_config(self, locale_code: str, store_name: Optional[str]) -> SemanticConfig:
+        """
+        Возвращает семантический конфиг для пары (locale, store).
+        
+        Результат запоминается на время жизни стадии: в батче чеков одного
+        магазина конфиг (и fallback, если загрузка упала) берётся из словаря,
+        без повторного обращения к ConfigLoader.
+        """
+        key = (locale_code, store_name)
+        semantic_config = self._semantic_configs.get(key)
+        if semantic_config is not None:
+            return semantic_config
+        
+        try:
+            full_config = self.config_loader.load(locale_code, store_name)
+            semantic_config = full_config.semantic
+        except Exception as e:
+            logger.warning(f"[SemanticStage] Ошибка загрузки конфига: {e}")
+            semantic_config = self._empty_semantic_config()
+        
+        self._semantic_configs[key] = semantic_config
+        return semantic_config
+    
+    def warmup(self, locale_codes: Sequence[str]) -> None:
+        """
+        Заранее загружает семантические конфиги локалей и их магазинов.
+        
+        Конфиги магазинов попадают и в общий кеш LocaleConfig,
+        которым пользуется Stage 6.
+        """
+        for locale_code in locale_codes:
+            store_names = [store.name for store in self.config_loader.load(locale_code).stores]
+            for store_name in (None, *store_names):
+                self._get_semantic_config(locale_code, store_name)
 
     def process(
         self, 
@@ -139,47 +225,55 @@ class SemanticStage:
         6. Сборка результата
         """
         # 1. Загрузка конфига
-        try:
-            full_config = self.config_loader.load(locale.locale_code, store.store_name)
-            semantic_config = full_config.semantic
-        except Exception as e:
-            logger.warning(f"[SemanticStage] Ошибка загрузки конфига: {e}")
-            semantic_config = self._empty_semantic_config()
+        semantic_config = self._get_semantic_config(locale.locale_code, store.store_name)
         
         # 2. Определение границ товарной зоны
         start_line, end_line = self.line_classifier.find_items_zone(layout, store, metadata)
         
+        # Классификация строк зоны за один проход (footer / header / служебные)
+        header_threshold = self.line_classifier.header_threshold(layout)
+        line_codes = self.line_classifier.classify_batch(
+            layout, start_line, end_line, metadata, semantic_config, header_threshold
+        )
+        
         # 3. Инициализация результатов
         items: List[ParsedItem] = []
         discounts: List[ParsedItem] = []
-        skipped = 0
         parsed = 0
         
-        # Контекстный буфер для многострочных названий
-        name_buffer = []
+        # Строки товарной зоны; строки до неё пропускаются без обхода
+        zone_start = min(start_line, len(layout.lines))
+        zone = layout.lines[zone_start:end_line + 1]
+        skipped = zone_start
         
-        # 4. Итерация по строкам
-        for i, line in enumerate(layout.lines):
-            # 4.1. Пропуски за границами товарной зоны
-            if i < start_line or i > end_line:
-                skipped += 1
-                continue
+        # Контекстный буфер для многострочных названий (старые имена вытесняются сами)
+        max_buffer = semantic_config.name_buffer_size if semantic_config else 3
+        name_buffer: Deque[str] = deque(maxlen=max(0, max_buffer))
+        
+        # Инварианты цикла для Price Sanity Check и Smart Cleaner
+        receipt_total = metadata.receipt_total or 0
+        clean_strategy = semantic_config.clean_outliers_strategy if semantic_config else None
+        
+        # 4. Итерация по строкам товарной зоны
+        for offset, line in enumerate(zone):
+            i = zone_start + offset
+            line_code = line_codes[offset]
             
             # 4.2. Footer Protector
-            if self.line_classifier.is_footer_line(line, i, metadata):
+            if line_code == LINE_FOOTER:
                 logger.debug(f"[SemanticStage] Footer Protector: Stop parsing at line {i}")
                 break
             
             # 4.3. Header Protector
-            if self.line_classifier.is_header_line(line, layout, semantic_config):
+            if line_code == LINE_HEADER:
                 logger.debug(f"[SemanticStage] Header Protector: Skip line '{line.text}'")
-                name_buffer = []  # Сброс буфера
+                name_buffer.clear()  # Сброс буфера
                 skipped += 1
                 continue
             
             # 4.4. Служебные строки
-            if self.line_classifier.should_skip(line.text, semantic_config):
-                name_buffer = []  # Сброс буфера
+            if line_code == LINE_SKIP:
+                name_buffer.clear()  # Сброс буфера
                 skipped += 1
                 continue
             
@@ -190,25 +284,32 @@ class SemanticStage:
             for sub_line in sub_lines:
                 line_items = self.item_parser.parse(sub_line, semantic_config)
                 
+                # Цены подстроки для Smart Cleaner: извлекаются один раз и только при аномалии
+                price_strings: Optional[List[str]] = None
+                
                 if line_items:
                     for item in line_items:
-                        # 4.7. Price Sanity Check
-                        receipt_total = metadata.receipt_total or 0
-                        is_valid, corrected_price = self.price_extractor.validate(
-                            item.total, 
-                            receipt_total, 
-                            len(items)
-                        )
+                        # 4.7. Price Sanity Check (без итога или цены проверять не с чем;
+                        # ItemParser товаров без цены не возвращает)
+                        if receipt_total <= 0 or item.total is None:
+                            is_valid = True
+                        else:
+                            is_valid, corrected_price = self.price_extractor.validate(
+                                item.total, 
+                                receipt_total, 
+                                len(items)
+                            )
                         
                         # Если цена аномальна, пробуем исправить
                         if not is_valid and receipt_total > 0:
                             # Ищем цену в исходной строке для Smart Cleaner
-                            price_strings = self.price_extractor.extract_strings(sub_line.text)
+                            if price_strings is None:
+                                price_strings = self.price_extractor.extract_strings(sub_line.text)
                             if price_strings:
                                 cleaned_price = self.price_extractor.clean_outlier(
                                     price_strings[0],
                                     receipt_total,
-                                    semantic_config.clean_outliers_strategy if semantic_config else None
+                                    clean_strategy
                                 )
                                 
                                 if cleaned_price:
@@ -224,9 +325,12 @@ class SemanticStage:
                         
                         # 4.8. Буфер имени (для многострочных названий)
                         cleaned_name = self.item_parser.clean_name(item.name)
-                        if (not cleaned_name or cleaned_name.replace('.', '').replace(',', '').isdigit()) and name_buffer:
+                        if (not cleaned_name or _NUMERIC_NAME_RE.fullmatch(cleaned_name)) and name_buffer:
                             item.name = " ".join(name_buffer) + " " + item.name
-                            name_buffer = []  # Использовали буфер
+                            name_buffer.clear()  # Использовали буфер
+                        
+                        # Одинаковые названия товаров из разных чеков делят одну строку
+                        item.name = sys.intern(item.name)
                         
                         # 4.9. Добавление в результат
                         parsed += 1
@@ -239,9 +343,9 @@ class SemanticStage:
                     potential_name = self.item_parser.clean_name(sub_line.text)
                     if potential_name and len(potential_name) > 3:
                         name_buffer.append(potential_name)
-                        max_buffer = semantic_config.name_buffer_size if semantic_config else 3
-                        if len(name_buffer) > max_buffer:
-                            name_buffer.pop(0)  # Ограничиваем размер буфера
+        else:
+            # 4.1. Строки после товарной зоны (только если не было футера)
+            skipped += len(layout.lines) - zone_start - len(zone)
         
         # 5. Сборка результата
         return SemanticResult(
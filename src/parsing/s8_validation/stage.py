@@ -24,7 +24,7 @@ from ..s7_semantic.stage import SemanticResult
 CHECKSUM_TOLERANCE = 0.05
 
 
-@dataclass
+@dataclass(slots=True)
 class ValidationResult:
     """
     Результат Stage 8: Validation.
@@ -87,9 +87,9 @@ class ValidationStage:
         """
         logger.debug("[Stage 8: Validation] Проверка checksum")
         
-        # Вычисляем суммы
-        items_sum = sum(item.total or 0 for item in semantic.items if not item.is_discount)
-        discounts_sum = sum(abs(item.total or 0) for item in semantic.discounts)
+        # Вычисляем суммы (те же, что в SemanticResult — без повторной логики)
+        items_sum = semantic.items_total
+        discounts_sum = semantic.discounts_total
         
         # Расчётная сумма (товары минус скидки)
         calculated_total = round(items_sum - discounts_sum, 2)
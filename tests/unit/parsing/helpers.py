@@ -0,0 +1,60 @@
+"""
+Общие фабрики для unit-тестов D2 Parsing.
+
+ЦКП: Одни и те же слова, строки и результаты этапов во всех тестах этапов.
+"""
+
+from typing import Optional
+
+from contracts.d1_extraction_dto import Word, BoundingBox
+from src.parsing.locales.config_loader import ConfigLoader, LocaleConfig
+from src.parsing.s3_layout import LayoutResult, Line
+from src.parsing.s4_locale_detection import LocaleResult
+
+
+def make_word(
+    text: str,
+    x: int,
+    y: int,
+    width: Optional[int] = None,
+    confidence: float = 0.9,
+) -> Word:
+    """Создаёт Word с заданными координатами (ширина по умолчанию — 10px на символ)."""
+    return Word(
+        text=text,
+        bounding_box=BoundingBox(x=x, y=y, width=10 * len(text) if width is None else width, height=20),
+        confidence=confidence,
+    )
+
+
+def create_layout_result(
+    lines: list[str],
+    y_start: int = 0,
+    image_height: int = 0,
+) -> LayoutResult:
+    """Создаёт LayoutResult из списка строк (шаг 20px по вертикали)."""
+    return LayoutResult(
+        lines=[Line(text=text, words=[], y_position=y_start + i * 20, confidence=0.9, line_number=i)
+               for i, text in enumerate(lines)],
+        image_height=image_height,
+        total_words=len(lines),
+    )
+
+
+def create_locale_result(locale_code: str) -> LocaleResult:
+    """Создаёт LocaleResult."""
+    return LocaleResult(
+        locale_code=locale_code,
+        confidence=0.9,
+    )
+
+
+class CountingConfigLoader(ConfigLoader):
+    """ConfigLoader, запоминающий обращения к load() как (locale, store)."""
+
+    def __init__(self) -> None:
+        self.calls: list[tuple[str, Optional[str]]] = []
+
+    def load(self, locale_code: str, store_name: Optional[str] = None) -> LocaleConfig:
+        self.calls.append((locale_code, store_name))
+        return super().load(locale_code, store_name)
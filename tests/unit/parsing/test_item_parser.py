@@ -0,0 +1,138 @@
+"""
+Unit-тесты для ItemParser (Stage 7).
+
+ЦКП: Проверка очистки названий товаров.
+"""
+
+import pytest
+from unittest.mock import patch
+
+from contracts.d1_extraction_dto import Word
+from src.parsing.s3_layout import Line
+from src.parsing.s7_semantic.item_parser import ItemParser
+from src.parsing.s7_semantic.price_extractor import PriceExtractor
+from src.parsing.s7_semantic.discount_handler import DiscountHandler
+
+from .helpers import make_word
+
+
+def make_line(words: list[Word]) -> Line:
+    """Создаёт Line из слов (как Stage 3)."""
+    return Line(
+        text=" ".join(w.text for w in words),
+        words=words,
+        y_position=min(w.bounding_box.y for w in words),
+        line_number=7,
+    )
+
+
+@pytest.fixture(scope="module")
+def parser():
+    return ItemParser(PriceExtractor(), DiscountHandler())
+
+
+class TestCleanName:
+    """Тесты очистки названия."""
+
+    @pytest.mark.parametrize("raw, expected", [
+        ("Apfel", "Apfel"),
+        ("  Bio   Milch  ", "Bio Milch"),
+        ("Bananen 2 x", "Bananen 2"),
+        ("-- Rabatt **", "Rabatt"),
+        ("Apfel A", "Apfel"),
+        ("Apfel Ä", "Apfel Ä"),
+        ("A", "A"),
+        ("", ""),
+    ])
+    def test_clean_name(self, parser, raw, expected):
+        """Убирает маркеры умножения, лишние пробелы, мусор и букву налога."""
+        assert parser.clean_name(raw) == expected
+
+
+class TestSplitByGeometry:
+    """Тесты геометрического разделения строки."""
+
+    def test_single_cluster_returns_same_line(self, parser):
+        """Слова в пределах порога — строка не делится."""
+        line = make_line([make_word("Apfel", 10, 100), make_word("1,99", 300, 110)])
+
+        assert parser.split_by_geometry(line, threshold=15) == [line]
+
+    def test_splits_into_clusters(self, parser):
+        """Слова с большим разрывом по Y делятся на строки, отсортированные по X."""
+        words = [
+            make_word("0,89", 300, 131, confidence=1.0),
+            make_word("Apfel", 10, 100, confidence=0.8),
+            make_word("Milch", 10, 130, confidence=0.6),
+            make_word("1,99", 300, 102, confidence=1.0),
+        ]
+
+        lines = parser.split_by_geometry(make_line(words), threshold=15)
+
+        assert [l.text for l in lines] == ["Apfel 1,99", "Milch 0,89"]
+        assert [(l.y_position, l.x_min, l.x_max) for l in lines] == [(100, 10, 340), (130, 10, 340)]
+        assert lines[0].confidence == pytest.approx(0.9)
+        assert lines[1].confidence == pytest.approx(0.8)
+        assert all(l.line_number == 7 for l in lines)
+
+
+class TestMultiItemSplit:
+    """Тесты разделения строки с несколькими товарами."""
+
+    def make_config(self, allow_joined: bool = False):
+        from src.parsing.locales.config_loader import SemanticConfig
+        return SemanticConfig(
+            skip_keywords=[], discount_keywords=[], weight_patterns=[], tax_patterns=[],
+            allow_joined_prices=allow_joined,
+        )
+
+    @pytest.mark.parametrize("allow_joined", [False, True])
+    def test_split_by_last_price(self, parser, allow_joined):
+        """Строка делится по последней цене, левая часть — рекурсивно."""
+        line = Line(text="A 1,99 B 2,99 3,99", words=[], y_position=0, line_number=4)
+
+        items = parser.parse(line, self.make_config(allow_joined))
+
+        assert [(i.name, i.total) for i in items] == [("A", 1.99), ("", 2.99), ("", 3.99)]
+        assert all(i.line_number == 4 for i in items)
+
+    def test_weight_item_not_split(self, parser):
+        """Весовой товар (qty price total) не делится."""
+        line = Line(text="CYTRYNY LUZ 0,29 A 9,99 A 2,90 C", words=[], y_position=0)
+
+        items = parser.parse(line, self.make_config())
+
+        assert [(i.quantity, i.price, i.total) for i in items] == [(0.29, 9.99, 2.90)]
+
+
+class TestDiscountFlags:
+    """Тесты флагов скидки и залога."""
+
+    @pytest.mark.parametrize("text, is_discount, is_pfand", [
+        ("Rabatt -0,50", True, False),
+        ("LEERGUT -0,25", False, True),
+        ("Pfand 0,25", False, True),
+        ("Apfel 1,99", False, False),
+    ])
+    def test_flags(self, parser, text, is_discount, is_pfand):
+        """Залог не считается скидкой даже с отрицательной ценой."""
+        from src.parsing.locales.config_loader import SemanticConfig
+        config = SemanticConfig(
+            skip_keywords=[], discount_keywords=["rabatt"], weight_patterns=[], tax_patterns=[],
+        )
+
+        items = parser.parse(Line(text=text, words=[], y_position=0), config)
+
+        assert [(i.is_discount, i.is_pfand) for i in items] == [(is_discount, is_pfand)]
+
+    def test_pfand_checked_once(self, parser):
+        """Регулярка залога выполняется один раз на строку."""
+        from src.parsing.locales.config_loader import SemanticConfig
+        config = SemanticConfig(
+            skip_keywords=[], discount_keywords=["rabatt"], weight_patterns=[], tax_patterns=[],
+        )
+
+        with patch.object(parser.discount_handler, "is_pfand", wraps=parser.discount_handler.is_pfand) as is_pfand:
+            parser.parse(Line(text="Apfel 1,99", words=[], y_position=0), config)
+
+        assert is_pfand.call_count == 1
@@ -0,0 +1,121 @@
+"""
+Unit-тесты для LineClassifier (Stage 7).
+
+ЦКП: Проверка классификации служебных строк чека.
+"""
+
+import pytest
+
+from src.parsing.locales.config_loader import SemanticConfig
+from src.parsing.s7_semantic.line_classifier import LineClassifier
+
+
+@pytest.fixture(scope="module")
+def config():
+    return SemanticConfig(
+        skip_keywords=["summe", "tel.", "www"],
+        discount_keywords=["rabatt"],
+        weight_patterns=[r"\d+[.,]\d+\s*kg\s*x"],
+        tax_patterns=[r"^[A-C]\s+\d+[.,]\d+\s*%"],
+        legal_header_identifiers=["USt-IdNr", "GmbH"],
+    )
+
+
+class TestShouldSkip:
+    """Тесты пропуска служебных строк."""
+
+    @pytest.mark.parametrize("text", [
+        "SUMME EUR 12,34",
+        "Tel. 0123 456",
+        "www.lidl.de",
+        "0,512 kg x 2,99 EUR/kg",
+        "A 19,0 % 1,23",
+        " ",
+    ])
+    def test_skipped(self, config, text):
+        """Ключевые слова, вес, налоги и пустые строки пропускаются."""
+        assert LineClassifier().should_skip(text, config)
+
+    @pytest.mark.parametrize("text", ["Apfel 1,99 A", "Telefonkarte 5,00"])
+    def test_item_not_skipped(self, config, text):
+        """Товарные строки не пропускаются."""
+        assert not LineClassifier().should_skip(text, config)
+
+    def test_empty_keywords(self):
+        """Пустой конфиг ничего не пропускает, кроме пустых строк."""
+        config = SemanticConfig(skip_keywords=[], discount_keywords=[], weight_patterns=[], tax_patterns=[])
+
+        assert config.skip_keywords_re is None
+        assert not LineClassifier().should_skip("SUMME 1,99", config)
+
+    def test_patterns_combined(self):
+        """Несколько tax_patterns собираются в одну регулярку."""
+        config = SemanticConfig(
+            skip_keywords=[], discount_keywords=[], weight_patterns=[],
+            tax_patterns=[r"^[A-C]\s+\d+\s*%", r"^\d+\s*%\s+[A-C]"],
+        )
+
+        assert len(config.tax_regexes) == 1
+        assert LineClassifier().should_skip("19 % B", config)
+        assert LineClassifier().should_skip("a 7 %", config)
+        assert not LineClassifier().should_skip("Apfel 19 %", config)
+
+
+class TestIsHeaderLine:
+    """Тесты Header Protector."""
+
+    def make_line(self, text: str, y: int):
+        from src.parsing.s3_layout import Line
+        return Line(text=text, words=[], y_position=y)
+
+    def test_header_in_top_third(self, config):
+        """Юридический идентификатор в верхней трети — заголовок."""
+        from src.parsing.s3_layout import LayoutResult
+        threshold = LineClassifier.header_threshold(LayoutResult(image_height=900))
+
+        assert threshold == 300
+        assert LineClassifier().is_header_line(self.make_line("Lidl GmbH & Co. KG", 100), threshold, config)
+        assert not LineClassifier().is_header_line(self.make_line("Lidl GmbH & Co. KG", 300), threshold, config)
+        assert not LineClassifier().is_header_line(self.make_line("Apfel 1,99", 100), threshold, config)
+
+
+class TestClassifyBatch:
+    """Тесты пакетной классификации строк товарной зоны."""
+
+    def make_layout(self, texts):
+        from src.parsing.s3_layout import LayoutResult, Line
+        return LayoutResult(
+            lines=[Line(text=t, words=[], y_position=100 * i, line_number=i) for i, t in enumerate(texts)],
+            image_height=900,
+        )
+
+    def test_matches_single_line_checks(self, config):
+        """Коды совпадают с is_footer_line / is_header_line / should_skip."""
+        from src.parsing.s6_metadata.stage import MetadataResult
+        from src.parsing.s7_semantic.line_classifier import LINE_FOOTER, LINE_HEADER, LINE_SKIP, LINE_ITEM
+
+        layout = self.make_layout([
+            "Lidl GmbH", "Tel. 0123", "Apfel 1,99", "x", "Milch www 0,89",
+            "0,512 kg x 2,99 EUR/kg", "Brot 2,49", "SUMME 5,37", "MwSt 19%", "Danke",
+        ])
+        metadata = MetadataResult(total_line_number=7)
+        classifier = LineClassifier()
+        threshold = classifier.header_threshold(layout)
+
+        codes = classifier.classify_batch(layout, 0, 9, metadata, config, threshold)
+
+        expected = []
+        for i, line in enumerate(layout.lines):
+            if classifier.is_footer_line(line, i, metadata):
+                expected.append(LINE_FOOTER)
+                break
+            if classifier.is_header_line(line, threshold, config):
+                expected.append(LINE_HEADER)
+            elif classifier.should_skip(line.text, config):
+                expected.append(LINE_SKIP)
+            else:
+                expected.append(LINE_ITEM)
+
+        assert codes == expected
+        assert codes[:3] == [LINE_HEADER, LINE_SKIP, LINE_ITEM]
+        assert codes[-1] == LINE_FOOTER and len(codes) == 9
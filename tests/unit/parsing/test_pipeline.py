@@ -0,0 +1,165 @@
+"""
+Unit-тесты для ParsingPipeline.
+
+ЦКП: Проверка сборки результата пайплайна на синтетическом чеке.
+"""
+
+import pytest
+
+from contracts.d1_extraction_dto import RawOCRResult, OCRMetadata
+from src.parsing.pipeline import ParsingPipeline
+from src.parsing.s1_ocr_cleanup import OCRCleanupStage
+
+from .helpers import make_word
+
+
+def make_receipt() -> RawOCRResult:
+    """Синтетический немецкий чек LIDL."""
+    rows = [
+        [("LIDL", 10)],
+        [("Musterstraße", 10), ("1", 150)],
+        [("12345", 10), ("Berlin", 80)],
+        [("Apfel", 10), ("1,99", 300), ("A", 360)],
+        [("Milch", 10), ("0,89", 300), ("A", 360)],
+        [("Summe", 10), ("2,88", 300)],
+        [("MwSt", 10), ("Netto", 80), ("Brutto", 160)],
+        [("Datum", 10), ("12.05.2024", 100)],
+    ]
+    words = [
+        make_word(text, x, 100 + row_idx * 40)
+        for row_idx, row in enumerate(rows)
+        for text, x in row
+    ]
+    return RawOCRResult(
+        full_text="\n".join(" ".join(t for t, _ in row) for row in rows),
+        words=words,
+        metadata=OCRMetadata(
+            source_file="synthetic.jpg",
+            image_width=800,
+            image_height=1200,
+            processed_at="2024-05-12T10:00:00",
+        ),
+    )
+
+
+@pytest.fixture(scope="module")
+def result():
+    return ParsingPipeline().process(make_receipt())
+
+
+class TestParsingPipeline:
+    """Тесты полного прогона пайплайна."""
+
+    def test_dto(self, result):
+        """DTO содержит товары, магазин, итог и дату."""
+        dto = result.dto
+
+        assert dto.merchant == "lidl"
+        assert dto.total_amount == 2.88
+        assert [item.name for item in dto.items] == ["Apfel", "Milch"]
+        assert dto.date is not None and dto.date.date().isoformat() == "2024-05-12"
+        assert all(item.date == dto.date for item in dto.items)
+        assert result.validation.passed
+        assert result.stages_completed == 8
+
+    def test_dto_matches_validated_model(self, result):
+        """DTO без повторной валидации совпадает с провалидированным контрактом."""
+        from contracts.d2_parsing_dto import RawReceiptDTO
+
+        dumped = result.dto.model_dump()
+
+        assert RawReceiptDTO.model_validate(dumped) == result.dto
+        assert all(isinstance(v, float) for v in dumped["metrics"].values())
+
+    def test_summary_dict(self, result):
+        """Сводка содержит только скаляры и совпадает с DTO."""
+        summary = result.to_summary_dict()
+
+        assert summary["merchant"] == "lidl"
+        assert summary["total"] == 2.88
+        assert summary["items_count"] == 2
+        assert summary["validation_passed"] is True
+        assert "dto" not in summary
+
+    def test_to_dict_without_intermediate(self, result):
+        """Без промежуточных результатов в dict только DTO и метрики."""
+        full = result.to_dict()
+        short = result.to_dict(include_intermediate=False)
+
+        assert set(short) == {"dto", "processing_time_ms", "stages_completed"}
+        assert short["dto"] == full["dto"]
+        assert full["semantic"]["items_total"] == result.semantic.items_total
+
+    def test_warmup_fills_stage_caches(self):
+        """Прогрев заполняет кеши стадий 4-7, результат обработки не меняется."""
+        pipeline = ParsingPipeline()
+
+        pipeline.warmup()
+
+        assert "de_DE" in pipeline.store_stage._store_keywords_cache
+        assert "de_DE" in pipeline.store_stage._address_patterns_cache
+        assert ("de_DE", "lidl") in pipeline.semantic_stage._semantic_configs
+        assert pipeline.process(make_receipt()).dto.merchant == "lidl"
+
+
+class TestPassThroughStages:
+    """Тесты пропуска заглушек Stage 1-2."""
+
+    def test_noop_stages_are_skipped(self, result):
+        """Заглушки не вызываются, но CleanupResult и слова для Layout на месте."""
+        words_count = len(make_receipt().words)
+
+        assert result.cleanup.cleaned_count == words_count
+        assert result.cleanup.removed_count == 0
+        assert result.script.direction == "ltr"
+        assert result.layout.total_words == words_count
+
+    def test_overridden_cleanup_stage_is_called(self):
+        """Этап с переопределённым process выполняется как обычно."""
+        calls = []
+
+        class CountingCleanupStage(OCRCleanupStage):
+            def process(self, raw_ocr):
+                calls.append(raw_ocr)
+                return super().process(raw_ocr)
+
+        result = ParsingPipeline(ocr_cleanup_stage=CountingCleanupStage()).process(make_receipt())
+
+        assert len(calls) == 1
+        assert result.cleanup.original_count == len(make_receipt().words)
+        assert result.stages_completed == 8
+
+    def test_stage_without_passthrough_flag_is_called(self, monkeypatch):
+        """Реализованный этап (флаг снят) вызывается, даже если класс тот же."""
+        calls = []
+        stub_process = OCRCleanupStage.process
+
+        def process(self, raw_ocr):
+            calls.append(raw_ocr)
+            return stub_process(self, raw_ocr)
+
+        monkeypatch.setattr(OCRCleanupStage, "is_passthrough", False)
+        monkeypatch.setattr(OCRCleanupStage, "process", process)
+
+        ParsingPipeline().process(make_receipt())
+
+        assert len(calls) == 1
+
+
+class TestProcessBatch:
+    """Тесты пакетной обработки."""
+
+    def test_batch_matches_single(self):
+        """Результаты батча совпадают с одиночной обработкой и идут по порядку."""
+        pipeline = ParsingPipeline()
+        receipts = [make_receipt() for _ in range(4)]
+
+        results = pipeline.process_batch(receipts, max_workers=2)
+
+        single = pipeline.process(make_receipt())
+        assert len(results) == 4
+        assert all(r.dto.model_dump() == single.dto.model_dump() for r in results)
+
+    def test_empty_batch(self):
+        """Пустой батч — пустой список."""
+        assert ParsingPipeline().process_batch([]) == []
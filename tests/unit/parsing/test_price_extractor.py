@@ -0,0 +1,114 @@
+"""
+Unit-тесты для PriceExtractor (Stage 7).
+
+ЦКП: Проверка извлечения цен из строк чека.
+"""
+
+import pytest
+
+from src.parsing.s7_semantic.price_extractor import PriceExtractor
+
+
+LINES = [
+    "Apfel 1,99 A",
+    "Milch 0,89",
+    "Pfand -0,25 B",
+    "2 x 1,49 2,98 A",
+    "Rabatt 1,99 abc",
+    "Datum 05.11.25",
+    "1* 1.495.00 1,495.00 B V",
+    "Olivenol6,95 A",
+    "Summe EUR 12,34",
+    "",
+]
+
+
+@pytest.fixture(scope="module")
+def extractor():
+    return PriceExtractor()
+
+
+class TestExtractAllWithStrings:
+    """Тесты совмещённого извлечения цен."""
+
+    @pytest.mark.parametrize("allow_joined", [False, True])
+    @pytest.mark.parametrize("text", LINES)
+    def test_matches_separate_methods(self, extractor, text, allow_joined):
+        """Результат совпадает с extract_all + extract_strings."""
+        expected = (
+            extractor.extract_all(text, allow_joined),
+            extractor.extract_strings(text, allow_joined),
+        )
+
+        assert extractor.extract_all_with_strings(text, allow_joined) == expected
+
+    def test_string_without_price_tail(self, extractor):
+        """Строка цены без хвоста попадает только в strings."""
+        prices, strings = extractor.extract_all_with_strings("Rabatt 1,99 abc 2,50")
+
+        assert prices == [2.5]
+        assert strings == ["1,99", "2,50"]
+
+    def test_line_without_separator(self, extractor):
+        """Строка без '.' и ',' не содержит цен."""
+        assert extractor.extract_all_with_strings("REWE Markt 12345") == ([], [])
+        assert extractor.extract_all("REWE Markt 12345", allow_joined=True) == []
+        assert extractor.extract_strings("12345") == []
+
+
+class TestDetectWeightPattern:
+    """Тесты детекции весового товара (qty price total)."""
+
+    def test_weight_item(self, extractor):
+        """0,29 * 9,99 ≈ 2,90 — весовой товар."""
+        assert extractor.detect_weight_pattern([0.29, 9.99, 2.90]) == (0.29, 9.99, 2.90)
+
+    @pytest.mark.parametrize("prices", [
+        [1.99, 2.99, 3.99],
+        [12.0, 1.0, 12.0],
+        [0.29, 9.99],
+        [],
+    ])
+    def test_not_weight_item(self, extractor, prices):
+        """Несовпадающее произведение, большой qty или не 3 цены — не вес."""
+        assert extractor.detect_weight_pattern(prices) is None
+
+
+class TestValidate:
+    """Тесты Price Sanity Check."""
+
+    @pytest.mark.parametrize("price, total, items_count, valid", [
+        (5.00, 0.0, 0, True),      # Без итога не валидируем
+        (12.00, 10.00, 0, False),  # Больше итога
+        (9.00, 10.00, 0, True),    # Маленький чек — без порога
+        (12.50, 25.01, 0, True),   # Средний чек: порог 50%
+        (12.51, 25.01, 0, False),
+        (20.04, 50.10, 2, True),   # Большой короткий чек: порог 40%
+        (20.05, 50.10, 2, False),
+        (20.04, 50.10, 6, False),  # Большой длинный чек: порог 25%
+    ])
+    def test_validate(self, extractor, price, total, items_count, valid):
+        """Адаптивный порог зависит от итога и числа товаров."""
+        is_valid, corrected = extractor.validate(price, total, items_count)
+
+        assert is_valid is valid
+        assert corrected == (price if valid else None)
+
+
+class TestCleanOutlier:
+    """Тесты Smart Cleaner."""
+
+    @pytest.mark.parametrize("price_str, total, expected", [
+        ("923,39", 50.0, 23.39),
+        ("923,39", 10.0, 3.39),
+        ("923,39", 5.0, None),
+        ("-12,50", 30.0, 12.50),
+        ("1,99", 1.0, None),
+    ])
+    def test_deep_prefix(self, extractor, price_str, total, expected):
+        """Отсекает цифры слева, пока цена не станет <= 50% итога."""
+        assert extractor.clean_outlier(price_str, total) == expected
+
+    def test_other_strategy(self, extractor):
+        """Стратегии кроме deep_prefix ничего не исправляют."""
+        assert extractor.clean_outlier("923,39", 50.0, strategy="standard") is None
@@ -0,0 +1,140 @@
+"""
+Unit-тесты для Stage 3: Layout Processing.
+
+ЦКП: Проверка группировки слов в строки и расчёта геометрии строк.
+"""
+
+import pytest
+
+from src.parsing.s2_script_detection import ScriptResult
+from src.parsing.s3_layout import LayoutStage
+
+from .helpers import make_word
+
+
+class TestCreateLine:
+    """Тесты сборки Line из слов."""
+
+    def test_geometry_and_confidence(self):
+        """Должен посчитать границы строки и среднюю уверенность."""
+        stage = LayoutStage()
+        words = [
+            make_word("Apfel", x=10, y=105, width=50, confidence=0.8),
+            make_word("1,99", x=300, y=100, width=40, confidence=1.0),
+        ]
+
+        line = stage._create_line(words, line_number=3)
+
+        assert line.text == "Apfel 1,99"
+        assert line.y_position == 100
+        assert line.x_min == 10
+        assert line.x_max == 340
+        assert line.confidence == pytest.approx(0.9)
+        assert line.line_number == 3
+
+    def test_single_word_line(self):
+        """Строка из одного слова берёт геометрию этого слова."""
+        stage = LayoutStage()
+        word = make_word("SUMME", x=20, y=500, width=60, confidence=0.7)
+
+        line = stage._create_line([word], line_number=0)
+
+        assert line.text == "SUMME"
+        assert (line.y_position, line.x_min, line.x_max) == (500, 20, 80)
+        assert line.confidence == 0.7
+
+
+class TestGroupWordsIntoLines:
+    """Тесты группировки слов в строки."""
+
+    def test_groups_by_y_and_sorts_by_x(self):
+        """Слова с близкими Y попадают в одну строку, отсортированную по X."""
+        stage = LayoutStage(y_threshold=15)
+        words = [
+            make_word("1,99", x=300, y=102),
+            make_word("SUMME", x=10, y=200),
+            make_word("Apfel", x=10, y=100),
+            make_word("5,00", x=300, y=205),
+        ]
+
+        result = stage.process(ScriptResult(words=words))
+
+        assert result.texts == ["Apfel 1,99", "SUMME 5,00"]
+        assert result.total_words == 4
+
+    def test_rtl_reverses_word_order(self):
+        """Для RTL слова в строке идут справа налево."""
+        stage = LayoutStage()
+        words = [
+            make_word("A", x=10, y=100),
+            make_word("B", x=100, y=100),
+        ]
+
+        result = stage.process(ScriptResult(direction="rtl", words=words))
+
+        assert result.texts == ["B A"]
+
+    def test_empty_words(self):
+        """Без слов возвращается пустой LayoutResult."""
+        result = LayoutStage().process(ScriptResult())
+
+        assert result.lines == []
+
+
+class TestSortByY:
+    """Тесты корзинной сортировки слов по Y."""
+
+    def test_matches_stable_sort(self):
+        """Результат совпадает со стабильной сортировкой по Y."""
+        stage = LayoutStage(y_threshold=15)
+        ys = [300, 14, 15, 0, 29, 300, 31, 16, 14, 1000, 45]
+        words = [make_word(f"w{i}", x=i, y=y) for i, y in enumerate(ys)]
+
+        expected = sorted(words, key=lambda w: w.bounding_box.y)
+
+        assert stage._sort_by_y(words) == expected
+
+    def test_presorted_words_kept(self):
+        """Уже отсортированные по Y слова возвращаются как есть."""
+        words = [make_word(f"w{i}", x=100 - i, y=y) for i, y in enumerate([0, 14, 14, 30, 31])]
+
+        assert LayoutStage()._sort_by_y(words) is words
+
+    def test_assume_sorted_skips_sort(self):
+        """assume_sorted=True доверяет порядку OCR без проверки."""
+        words = [make_word("b", x=0, y=100), make_word("a", x=0, y=10)]
+
+        assert LayoutStage(assume_sorted=True)._sort_by_y(words) is words
+
+
+class TestLineCaches:
+    """Тесты кешируемых производных полей строки."""
+
+    def test_text_lower(self):
+        """text_lower — текст строки в нижнем регистре."""
+        line = LayoutStage()._create_line([make_word("SUMME", x=10, y=100)], line_number=0)
+
+        assert line.text_lower == "summe"
+
+    def test_word_ys(self):
+        """word_ys повторяет порядок words и считается один раз."""
+        line = LayoutStage()._create_line(
+            [make_word("Apfel", x=10, y=105), make_word("1,99", x=300, y=100)],
+            line_number=0,
+        )
+
+        assert line.word_ys == (105, 100)
+        assert line.word_ys is line.word_ys
+
+    def test_full_text_lower(self):
+        """full_text_lower совпадает с full_text.lower() и считается один раз."""
+        stage = LayoutStage()
+        result = stage.process(ScriptResult(words=[
+            make_word("SUMME", x=10, y=100),
+            make_word("EUR", x=100, y=100),
+            make_word("MwSt", x=10, y=200),
+        ]))
+
+        assert result.full_text_lower == result.full_text.lower() == "summe eur\nmwst"
+        assert result.full_text_lower is result.full_text_lower
+        assert result.full_text is result.full_text
@@ -8,26 +8,9 @@ import pytest
 from unittest.mock import MagicMock
 
 from src.parsing.s5_store_detection import StoreDetectionStage as StoreStage, StoreResult
-from src.parsing.s3_layout import LayoutResult, Line
-from src.parsing.s4_locale_detection import LocaleResult
 from src.parsing.locales.config_loader import LocaleConfig
 
-
-def create_layout_result(lines: list[str]) -> LayoutResult:
-    """Создаёт LayoutResult из списка строк."""
-    return LayoutResult(
-        lines=[Line(text=text, words=[], y_position=i * 20, confidence=0.9, line_number=i) 
-               for i, text in enumerate(lines)],
-        total_words=len(lines),
-    )
-
-
-def create_locale_result(locale_code: str) -> LocaleResult:
-    """Создаёт LocaleResult."""
-    return LocaleResult(
-        locale_code=locale_code,
-        confidence=0.9,
-    )
+from .helpers import CountingConfigLoader, create_layout_result, create_locale_result
 
 
 class TestStoreDetectionFromConfig:
@@ -154,6 +137,49 @@ class TestStoreDetectionFromConfig:
         
         assert result.store_name == "lidl"
         assert result.confidence == 0.7  # Global fallback = 0.7
+    
+    def test_local_store_beats_earlier_global_brand(self):
+        """Магазин из конфига локали важнее глобального бренда, даже найденного выше."""
+        LocaleConfig._cache.clear()
+        
+        stage = StoreStage()
+        layout = create_layout_result([
+            "Carrefour Gutschein",  # Глобальный бренд, не из конфигов de_DE
+            "REWE Markt GmbH",
+        ])
+        locale = create_locale_result("de_DE")
+        
+        result = stage.process(layout, locale)
+        
+        assert result.store_name == "rewe"
+        assert result.matched_in_line == 1
+        assert result.confidence == 1.0
+    
+    @pytest.mark.parametrize("locale_code, text, expected, confidence", [
+        ("de_DE", "MARKTKAUF EDEKA", "marktkauf", 0.9),   # 'edeka' — бренд магазина edeka
+        ("de_DE", "REWE Center", "rewe", 0.9),            # 'e center' — alias магазина edeka
+        ("de_DE", "EDEKA Center", "edeka", 1.0),
+        ("pt_PT", "AUCHAN JUMBO", "jumbo", 0.9),          # 'auchan' — бренд магазина auchan
+        ("pt_PT", "JUMBO", "jumbo", 1.0),
+    ])
+    def test_longer_keyword_of_other_store_wins(self, locale_code, text, expected, confidence):
+        """Слово магазина, содержащее слово другого магазина, проверяется раньше него."""
+        LocaleConfig._cache.clear()
+        
+        stage = StoreStage()
+        result = stage.process(create_layout_result([text]), create_locale_result(locale_code))
+        
+        assert (result.store_name, result.confidence) == (expected, confidence)
+    
+    def test_shared_alias_stays_with_earlier_store(self):
+        """Alias, общий для двух магазинов, не переносится перед брендом первого."""
+        LocaleConfig._cache.clear()
+        
+        stage = StoreStage()
+        layout = create_layout_result(["AUCHAN RETAIL PORTUGAL, S.A."])
+        result = stage.process(layout, create_locale_result("pt_PT"))
+        
+        assert (result.store_name, result.confidence) == ("auchan", 1.0)
 
 
 class TestStoreAddressExtraction:
@@ -211,6 +237,23 @@ class TestStoreAddressExtraction:
         assert result.store_address is not None
         # Адрес должен содержать улицу и город
         assert "Musterstraße" in result.store_address or "Berlin" in result.store_address
+    
+    def test_address_stops_at_price_line(self):
+        """Строка с валютой (базовое исключение) обрывает адрес."""
+        LocaleConfig._cache.clear()
+        
+        stage = StoreStage()
+        layout = create_layout_result([
+            "LIDL",
+            "12345 Berlin",
+            "Apfel 1,99 €",
+            "10115 Berlin",
+        ])
+        locale = create_locale_result("de_DE")
+        
+        result = stage.process(layout, locale)
+        
+        assert result.store_address == "12345 Berlin"
 
 
 class TestStoreScanLimit:
@@ -262,3 +305,30 @@ class TestStoreResultToDict:
         assert d["store_address"] == "Musterstraße 123"
         assert d["confidence"] == 0.95
         assert d["matched_in_line"] == 0
+
+
+class TestHasDigit:
+    """Тесты поиска цифр в строке адреса."""
+
+    @pytest.mark.parametrize("text", ["Musterstraße 1", "m²", "①", "Straße", "", "١٢"])
+    def test_matches_isdigit(self, text):
+        """Совпадает с посимвольной проверкой str.isdigit()."""
+        from src.parsing.s5_store_detection.stage import _has_digit
+
+        assert _has_digit(text) == any(c.isdigit() for c in text)
+
+
+class TestConfigCache:
+    """Тесты кеша конфигов локалей в стадии."""
+
+    def test_config_loaded_once_per_locale(self):
+        """Магазины и признаки адреса берутся из одного загруженного конфига."""
+        loader = CountingConfigLoader()
+        stage = StoreStage(config_loader=loader)
+        layout = create_layout_result(["LIDL", "Musterstraße 123", "12345 Berlin"])
+
+        for _ in range(2):
+            result = stage.process(layout, create_locale_result("de_DE"))
+
+        assert result.store_address == "Musterstraße 123, 12345 Berlin"
+        assert loader.calls == [("de_DE", None)]
@@ -0,0 +1,81 @@
+"""
+Unit-тесты для Stage 4: Locale Detection.
+
+ЦКП: Проверка определения локали по ключевым словам из конфигов.
+"""
+
+import pytest
+
+from src.parsing.s4_locale_detection import LocaleDetectionStage
+
+from .helpers import create_layout_result
+
+
+@pytest.fixture(scope="module")
+def stage():
+    return LocaleDetectionStage()
+
+
+class TestLocaleDetection:
+    """Тесты определения локали."""
+
+    def test_detect_de_DE(self, stage):
+        """Немецкий чек определяется как de_DE."""
+        layout = create_layout_result([
+            "REWE Markt GmbH",
+            "Apfel 1,99",
+            "SUMME EUR 1,99",
+            "MwSt Netto Brutto",
+        ])
+
+        result = stage.process(layout)
+
+        assert result.locale_code == "de_DE"
+        assert result.confidence > 0
+        assert "summe" in result.matched_keywords
+        assert "mwst" in result.matched_keywords
+
+    def test_detect_pl_PL(self, stage):
+        """Польский чек определяется как pl_PL."""
+        layout = create_layout_result([
+            "BIEDRONKA",
+            "SUMA PLN 12,00",
+            "PTU A 23%",
+            "Gotowka 20,00 Reszta 8,00",
+        ])
+
+        result = stage.process(layout)
+
+        assert result.locale_code == "pl_PL"
+
+    def test_fallback_to_default(self, stage):
+        """Без ключевых слов используется локаль по умолчанию."""
+        layout = create_layout_result(["???", "12345"])
+
+        result = stage.process(layout)
+
+        assert result.locale_code == "de_DE"
+        assert result.confidence == 0.0
+
+
+class TestLocaleScores:
+    """Тесты подсчёта очков по локалям."""
+
+    def test_scores_are_exact_for_all_locales(self, stage):
+        """Очки каждой локали — число её ключевых слов, найденных в тексте."""
+        layout = create_layout_result([
+            "LIDL",
+            "SUMME EUR 1,99",
+            "MwSt Netto Brutto",
+            "SUMA PLN",
+        ])
+        full_text = layout.full_text.lower()
+
+        result = stage.process(layout)
+
+        expected = {
+            locale_code: sum(kw_lower in full_text for kw_lower, _ in keywords)
+            for locale_code, keywords in stage._get_all_locale_keywords().items()
+        }
+        assert result.scores == expected
+        assert result.scores["pl_PL"] > 0
@@ -0,0 +1,174 @@
+"""
+Unit-тесты для Stage 6: Metadata Extraction.
+
+ЦКП: Проверка извлечения даты и итоговой суммы чека.
+"""
+
+from dataclasses import replace
+from datetime import date
+
+import pytest
+
+from src.parsing.locales.config_loader import ConfigLoader, MetadataConfig
+from src.parsing.s6_metadata import MetadataStage
+from src.parsing.s6_metadata.stage import _date_patterns_for, _keyword_score
+
+from .helpers import create_layout_result
+
+
+@pytest.fixture(scope="module")
+def stage():
+    return MetadataStage()
+
+
+@pytest.fixture(scope="module")
+def config():
+    return ConfigLoader().load("de_DE")
+
+
+class TestExtractDate:
+    """Тесты извлечения даты."""
+
+    def test_european_date(self, stage):
+        """DD.MM.YYYY разбирается как день-месяц-год."""
+        layout = create_layout_result(["LIDL", "Datum 05.03.2024 10:15"])
+
+        assert stage._extract_date(layout, "de_DE") == (date(2024, 3, 5), "05.03.2024")
+
+    def test_short_year(self, stage):
+        """Двузначный год дополняется до 20xx."""
+        layout = create_layout_result(["31.12.24"])
+
+        assert stage._extract_date(layout, "de_DE")[0] == date(2024, 12, 31)
+
+    def test_iso_date(self, stage):
+        """YYYY-MM-DD разбирается в ISO-порядке."""
+        layout = create_layout_result(["2024-12-31 18:00"])
+
+        assert stage._extract_date(layout, "pl_PL")[0] == date(2024, 12, 31)
+
+    def test_unknown_locale_uses_default(self, stage):
+        """Для неизвестной локали работают дефолтные паттерны."""
+        layout = create_layout_result(["31/12/2024"])
+
+        assert stage._extract_date(layout, "xx_XX")[0] == date(2024, 12, 31)
+
+    def test_out_of_range_year_skipped(self, stage):
+        """Дата вне допустимого диапазона лет не принимается."""
+        layout = create_layout_result(["01.01.1999", "02.02.2024"])
+
+        assert stage._extract_date(layout, "de_DE")[0] == date(2024, 2, 2)
+
+    def test_impossible_day_skipped(self, stage):
+        """Несуществующий день (31 февраля) пропускается, берётся следующая дата."""
+        layout = create_layout_result(["31.02.2024", "01.03.2024"])
+
+        assert stage._extract_date(layout, "de_DE")[0] == date(2024, 3, 1)
+
+    def test_patterns_shared_between_stages(self, stage):
+        """Скомпилированные паттерны общие для всех экземпляров стадии."""
+        layout = create_layout_result(["12.05.2024"])
+        other = MetadataStage()
+
+        assert other._extract_date(layout, "de_DE") == stage._extract_date(layout, "de_DE")
+        assert _date_patterns_for("de_DE") is _date_patterns_for("de_DE")
+        assert _date_patterns_for.cache_info().currsize <= len(MetadataStage.DATE_PATTERNS)
+
+    def test_pattern_priority_over_position(self, stage):
+        """Более приоритетный паттерн выигрывает, даже если совпадение правее."""
+        layout = create_layout_result(["01.02.24 03.04.2024"])
+
+        assert stage._extract_date(layout, "de_DE") == (date(2024, 4, 3), "03.04.2024")
+
+
+class TestExtractTotal:
+    """Тесты извлечения итоговой суммы."""
+
+    def test_strong_keyword_wins(self, stage, config):
+        """Строка с 'SUMME' выигрывает у промежуточных сумм."""
+        layout = create_layout_result([
+            "Apfel 1,99",
+            "Milch 0,89",
+            "SUMME EUR 2,88",
+            "Netto 2,42",
+        ])
+
+        total, raw, line_number = stage._extract_total(layout, config)
+
+        assert (total, line_number) == (2.88, 2)
+        assert "2,88" in raw
+
+    def test_skip_keyword_line_with_total_keyword(self, stage, config):
+        """Шумовое слово не отбрасывает строку, в которой есть ключевое слово суммы."""
+        layout = create_layout_result([
+            "Apfel 1,99",
+            "Kartenzahlung Summe 2,88",
+            "Bargeld 50,00",
+        ])
+
+        assert stage._extract_total(layout, config) == (2.88, "2,88", 1)
+
+    def test_total_keywords_case_insensitive(self, stage, config):
+        """Ключевые слова суммы из конфига сравниваются без учёта регистра."""
+        config = replace(config, metadata=MetadataConfig(total_keywords=["SUMME"]))
+        layout = create_layout_result(["Apfel 1,99", "Summe 1,99"])
+
+        assert config.metadata.total_keywords_lower == ("summe",)
+        assert stage._extract_total(layout, config) == (1.99, "1,99", 1)
+
+    def test_fallback_lower_third(self, stage, config):
+        """Без ключевых слов берётся сумма из нижней трети чека."""
+        layout = create_layout_result(["Apfel", "Milch", "Brot", "Wurst", "Käse", "12,50"])
+
+        assert stage._extract_total(layout, config) == (12.5, "12,50", 5)
+
+    def test_fallback_skips_already_priced_lines(self, config):
+        """Fallback не ищет цену повторно в строках с ключевым словом."""
+        calls = []
+
+        class CountingStage(MetadataStage):
+            def _extract_price_from_line(self, text):
+                calls.append(text)
+                return super()._extract_price_from_line(text)
+
+        layout = create_layout_result(["Apfel", "Milch", "Brot", "Summe 0,00", "12,50"])
+
+        assert CountingStage()._extract_total(layout, config) == (12.5, "12,50", 4)
+        assert calls == ["Summe 0,00", "12,50"]
+
+    def test_no_total(self, stage, config):
+        """Без цен сумма не находится."""
+        layout = create_layout_result(["LIDL", "Danke"])
+
+        assert stage._extract_total(layout, config) == (None, None, -1)
+
+
+class TestKeywordScore:
+    """Тесты веса строки-кандидата по ключевым словам."""
+
+    @pytest.mark.parametrize("line_lower, expected", [
+        ("summe eur 2,88", 100.0),          # сильное слово важнее слабого
+        ("gesamtbetrag 2,88", 100.0),       # сильное, хотя содержит слабое 'gesamt'
+        ("gesamt 2,88", 20.0),
+        ("netto 2,42", -50.0),
+        ("mwst eur 0,46", 20.0),            # слабое важнее компонента
+        ("2,88", 0.0),
+    ])
+    def test_keyword_score(self, line_lower, expected):
+        assert _keyword_score(line_lower) == expected
+
+
+class TestExtractPrice:
+    """Тесты разбора цены из строки."""
+
+    @pytest.mark.parametrize("text, expected", [
+        ("SUMME 12,34 EUR", (12.34, "12,34 EUR")),
+        ("EUR 5.00", (5.0, "5.00")),
+        ("€ 7,10", (7.1, "7,10")),
+        ("1.234,56", (None, None)),
+        ("Art.1,99", (None, None)),         # слева от числа точка — не цена
+        ("x12,50", (12.5, "12,50")),
+        ("Danke", (None, None)),
+    ])
+    def test_extract_price(self, stage, text, expected):
+        assert stage._extract_price_from_line(text) == expected
@@ -0,0 +1,171 @@
+"""
+Unit-тесты для Stage 7: Semantic Extraction.
+
+ЦКП: Проверка оркестрации семантического этапа.
+"""
+
+import pytest
+
+from src.parsing.s4_locale_detection import LocaleResult
+from src.parsing.s5_store_detection import StoreResult
+from src.parsing.s6_metadata import MetadataResult
+from src.parsing.s7_semantic import SemanticStage
+
+from .helpers import CountingConfigLoader, create_layout_result
+
+
+class TestSemanticConfigCache:
+    """Тесты кеша семантических конфигов."""
+
+    def test_config_loaded_once_per_pair(self):
+        """Повторный запрос той же пары (locale, store) не обращается к загрузчику."""
+        loader = CountingConfigLoader()
+        stage = SemanticStage(config_loader=loader)
+
+        first = stage._get_semantic_config("de_DE", "lidl")
+        second = stage._get_semantic_config("de_DE", "lidl")
+        stage._get_semantic_config("de_DE", None)
+
+        assert first is second
+        assert loader.calls == [("de_DE", "lidl"), ("de_DE", None)]
+
+    def test_fallback_cached(self):
+        """Ошибка загрузки даёт пустой конфиг, который тоже запоминается."""
+        loader = CountingConfigLoader()
+        stage = SemanticStage(config_loader=loader)
+
+        config = stage._get_semantic_config("xx_XX", None)
+        stage._get_semantic_config("xx_XX", None)
+
+        assert config.skip_keywords == []
+        assert loader.calls == [("xx_XX", None)]
+
+
+class TestSemanticResultTotals:
+    """Тесты сумм товаров и скидок."""
+
+    def test_totals_are_exact(self):
+        """Суммы считаются через fsum без накопления ошибки float."""
+        from src.parsing.s7_semantic import SemanticResult, ParsedItem
+
+        result = SemanticResult(
+            items=[ParsedItem(name=f"item{i}", total=0.1) for i in range(10)],
+            discounts=[ParsedItem(name="Rabatt", total=-0.25, is_discount=True) for _ in range(3)],
+        )
+
+        assert result.items_total == 1.0
+        assert result.discounts_total == 0.75
+
+    def test_totals_computed_once(self):
+        """Суммы кешируются: повторное чтение не пересчитывает товары."""
+        from src.parsing.s7_semantic import SemanticResult, ParsedItem
+
+        result = SemanticResult(items=[ParsedItem(name="Apfel", total=1.99)])
+        first = result.items_total
+        result.items[0].total = 5.0
+
+        assert result.items_total == first == 1.99
+        assert "_items_total" not in result.to_dict()
+
+    def test_empty_totals(self):
+        """Пустой результат даёт нулевые суммы типа float."""
+        from src.parsing.s7_semantic import SemanticResult
+
+        assert SemanticResult().items_total == 0.0
+        assert isinstance(SemanticResult().discounts_total, float)
+
+
+class TestItemsZone:
+    """Тесты обхода товарной зоны."""
+
+    @pytest.mark.parametrize("store_line, total_line, expected_skipped, expected_items", [
+        (0, 5, 3, ["Apfel", "Milch", "Brot"]),  # Зона 2..4, строки 0-1 и 5 за её пределами
+        (4, 2, 6, []),                          # Пустая зона — все строки пропущены
+    ])
+    def test_zone_bounds(self, store_line, total_line, expected_skipped, expected_items):
+        """Строки вне зоны считаются пропущенными, товары берутся только из зоны."""
+        layout = create_layout_result(
+            ["LIDL", "Musterstr. 1", "Apfel 1,99", "Milch 0,89", "Brot 2,49", "SUMME 5,37"],
+            y_start=1000, image_height=1200,
+        )
+
+        result = SemanticStage().process(
+            layout,
+            LocaleResult(locale_code="de_DE"),
+            StoreResult(store_name="lidl", matched_in_line=store_line),
+            MetadataResult(receipt_total=5.37, total_line_number=total_line),
+        )
+
+        assert [item.name for item in result.items] == expected_items
+        assert result.skipped_lines == expected_skipped
+
+    def test_item_names_interned(self):
+        """Одинаковые названия из разных чеков — один и тот же объект строки."""
+        stage = SemanticStage()
+        names = []
+        for _ in range(2):
+            layout = create_layout_result(
+                ["LIDL", "Musterstr. 1", "Apfel 1,99", "SUMME 1,99"],
+                y_start=1000, image_height=1200,
+            )
+            result = stage.process(
+                layout,
+                LocaleResult(locale_code="de_DE"),
+                StoreResult(store_name="lidl", matched_in_line=0),
+                MetadataResult(receipt_total=1.99, total_line_number=3),
+            )
+            names.append(result.items[0].name)
+
+        assert names[0] == "Apfel"
+        assert names[0] is names[1]
+
+
+class TestPriceSanityCheck:
+    """Тесты проверки цен относительно итога."""
+
+    def test_no_total_skips_validate(self):
+        """Без итога чека validate() не вызывается, все товары сохраняются."""
+        stage = SemanticStage()
+        calls = []
+        stage.price_extractor.validate = lambda *args: calls.append(args) or (False, None)
+        layout = create_layout_result(
+            ["LIDL", "Musterstr. 1", "Apfel 1,99", "Milch 0,89", "SUMME"],
+            y_start=1000, image_height=1200,
+        )
+
+        result = stage.process(
+            layout,
+            LocaleResult(locale_code="de_DE"),
+            StoreResult(store_name="lidl", matched_in_line=0),
+            MetadataResult(receipt_total=None, total_line_number=4),
+        )
+
+        assert [item.name for item in result.items] == ["Apfel", "Milch"]
+        assert calls == []
+
+
+class TestToRawItem:
+    """Тесты конвертации ParsedItem в RawReceiptItem."""
+
+    def test_matches_validated_item(self):
+        """Результат совпадает с провалидированным RawReceiptItem."""
+        from datetime import datetime
+        from contracts.d2_parsing_dto import RawReceiptItem
+        from src.parsing.s7_semantic import ParsedItem
+
+        date = datetime(2024, 5, 12)
+        item = ParsedItem(name="Apfel", quantity=2.0, price=0.99, total=1.98, raw_text="Apfel 2 x 0,99")
+
+        raw = item.to_raw_item(date)
+
+        assert raw == RawReceiptItem(
+            name="Apfel", quantity=2.0, price=0.99, total=1.98, date=date, raw_text="Apfel 2 x 0,99"
+        )
+
+    def test_invalid_quantity_raises(self):
+        """Невалидное количество по-прежнему поднимает ValidationError."""
+        from pydantic import ValidationError
+        from src.parsing.s7_semantic import ParsedItem
+
+        with pytest.raises(ValidationError):
+            ParsedItem(name="Apfel", quantity=0.0, total=1.0).to_raw_item(None)